@@ -0,0 +1,156 @@
+import json
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from update_validator import DTYPE_SIZES, InvalidUpdateError, read_safetensors_header
+from worker_pool import WorkerPool
+
+# Elements combined per slice; bounds the float64 accumulator to 32MB per worker
+CHUNK_ELEMENTS = 1 << 22
+
+# Below this many output bytes the pool start-up costs more than it saves
+IN_PROCESS_THRESHOLD = 64 * 1024 * 1024
+
+FLOAT_DTYPES = {"F64": np.float64, "F32": np.float32, "F16": np.float16}
+
+SUPPORTED_METHODS = ("fedavg",)
+
+def _decode(raw: np.ndarray, dtype: str) -> np.ndarray:
+    if dtype == "BF16":
+        return (raw.view(np.uint16).astype(np.uint32) << 16).view(np.float32)
+    return raw.view(FLOAT_DTYPES[dtype])
+
+def _encode(values: np.ndarray, dtype: str) -> np.ndarray:
+    if dtype == "BF16":
+        # Round to nearest even when dropping the low mantissa bits
+        bits = values.astype(np.float32).view(np.uint32)
+        bits = bits + 0x7FFF + ((bits >> 16) & 1)
+        return (bits >> 16).astype(np.uint16).view(np.uint8)
+    return values.astype(FLOAT_DTYPES[dtype]).view(np.uint8)
+
+def _aggregate_shard(
+    output_path: str,
+    output_data_offset: int,
+    tensors: List[Tuple[str, str, int, int]],
+    inputs: List[Tuple[str, int, Dict[str, int]]],
+    weights: List[float],
+) -> int:
+    """Runs in a worker process. Every worker maps the same input files and writes its
+    tensors straight into the shared output file, so no tensor data is pickled."""
+    output = np.memmap(output_path, dtype=np.uint8, mode="r+")
+    sources = [(np.memmap(path, dtype=np.uint8, mode="r"), data_offset, offsets) for path, data_offset, offsets in inputs]
+    written = 0
+    try:
+        for name, dtype, out_begin, out_end in tensors:
+            nbytes = out_end - out_begin
+            out = output[output_data_offset + out_begin:output_data_offset + out_end]
+
+            if dtype not in FLOAT_DTYPES and dtype != "BF16":
+                # Integer and boolean tensors (ids, masks) are not averaged; keep the first client's copy
+                data, data_offset, offsets = sources[0]
+                begin = data_offset + offsets[name]
+                out[:] = data[begin:begin + nbytes]
+                written += nbytes
+                continue
+
+            itemsize = DTYPE_SIZES[dtype]
+            count = nbytes // itemsize
+            for start in range(0, count, CHUNK_ELEMENTS):
+                stop = min(start + CHUNK_ELEMENTS, count)
+                acc = np.zeros(stop - start, dtype=np.float64)
+                for (data, data_offset, offsets), weight in zip(sources, weights):
+                    begin = data_offset + offsets[name] + start * itemsize
+                    acc += weight * _decode(data[begin:begin + (stop - start) * itemsize], dtype).astype(np.float64)
+                out[start * itemsize:stop * itemsize] = _encode(acc, dtype)
+            written += nbytes
+        output.flush()
+    finally:
+        del output
+        del sources
+    return written
+
+def _partition(tensors: Sequence[Tuple[str, str, int, int]], n: int) -> List[List[Tuple[str, str, int, int]]]:
+    # Greedy largest-first assignment keeps the shards close in bytes
+    shards: List[List[Tuple[str, str, int, int]]] = [[] for _ in range(n)]
+    loads = [0] * n
+    for tensor in sorted(tensors, key=lambda t: t[3] - t[2], reverse=True):
+        i = loads.index(min(loads))
+        shards[i].append(tensor)
+        loads[i] += tensor[3] - tensor[2]
+    return [shard for shard in shards if shard]
+
+def _write_output_header(output_path: str, header: Dict, metadata: Dict[str, str]) -> Tuple[List[Tuple[str, str, int, int]], int]:
+    layout = []
+    out_header = {"__metadata__": metadata}
+    offset = 0
+    for name, info in sorted(header.items(), key=lambda kv: kv[1]["data_offsets"][0]):
+        nbytes = info["data_offsets"][1] - info["data_offsets"][0]
+        out_header[name] = {"dtype": info["dtype"], "shape": info["shape"], "data_offsets": [offset, offset + nbytes]}
+        layout.append((name, info["dtype"], offset, offset + nbytes))
+        offset += nbytes
+
+    header_bytes = json.dumps(out_header, separators=(",", ":")).encode("utf-8")
+    # safetensors pads the header with spaces so the data section is 8-byte aligned
+    header_bytes += b" " * (-len(header_bytes) % 8)
+    data_offset = 8 + len(header_bytes)
+
+    with open(output_path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.truncate(data_offset + offset)
+    return layout, data_offset
+
+class Aggregator:
+    def __init__(self, max_workers: Optional[int] = None):
+        self.pool = WorkerPool(max_workers)
+        self.max_workers = self.pool.max_workers
+
+    def aggregate(self, update_paths: List[str], output_path: str, method: str = "fedavg", weights: Optional[List[float]] = None) -> int:
+        """Combines the updates into `output_path`, a new safetensors file. Returns bytes of tensor data written."""
+        if method not in SUPPORTED_METHODS:
+            raise ValueError(f"Unsupported aggregation method: {method}")
+        if not update_paths:
+            raise ValueError("No updates to aggregate")
+
+        headers = [read_safetensors_header(path) for path in update_paths]
+        reference = headers[0][0]
+        for path, (header, _) in zip(update_paths, headers):
+            if {k: (v["dtype"], v["shape"]) for k, v in header.items()} != {k: (v["dtype"], v["shape"]) for k, v in reference.items()}:
+                raise InvalidUpdateError(f"Update {os.path.basename(path)} does not match the round's tensor layout")
+            if any(v["dtype"].startswith("F8_") for v in header.values()):
+                raise InvalidUpdateError("FP8 tensors cannot be aggregated")
+
+        if weights is None:
+            weights = [1.0] * len(update_paths)
+        total = float(sum(weights))
+        weights = [w / total for w in weights]
+
+        layout, output_data_offset = _write_output_header(
+            output_path, reference, {"aggregation": method, "num_updates": str(len(update_paths))}
+        )
+        total_bytes = layout[-1][3] if layout else 0
+
+        def shard_args(shard):
+            names = [t[0] for t in shard]
+            inputs = [
+                (path, data_offset, {name: header[name]["data_offsets"][0] for name in names})
+                for path, (header, data_offset) in zip(update_paths, headers)
+            ]
+            return (output_path, output_data_offset, shard, inputs, weights)
+
+        if total_bytes < IN_PROCESS_THRESHOLD or self.max_workers == 1:
+            return _aggregate_shard(*shard_args(layout)) if layout else 0
+
+        shards = _partition(layout, self.max_workers)
+        # A crashed worker surfaces as BrokenProcessPool; the pool replaces itself for the next round
+        futures = [self.pool.submit(_aggregate_shard, *shard_args(shard)) for shard in shards]
+        return sum(f.result() for f in futures)
+
+    def shutdown(self, wait: bool = False):
+        self.pool.shutdown(wait)
+
+# Global instance
+aggregator = Aggregator()
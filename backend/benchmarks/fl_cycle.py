@@ -0,0 +1,172 @@
+"""Load test of the federated client cycle: register -> download model -> upload update.
+
+Run from the backend directory:
+
+    python -m benchmarks.fl_cycle --clients 16 --rounds 3 --update-mb 50 --json fl.json
+"""
+import argparse
+import http.client
+import json
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.harness import (
+    LocalServer, ResourceSampler, compare_to_baseline, encode_multipart, environment_info,
+    print_report, request, request_json, summarize, write_report,
+)
+
+EXPERIMENT_ID = "bench"
+
+# Tensors are capped at this size so the layout resembles a real adapter
+MAX_TENSOR_BYTES = 16 * 1024 * 1024
+
+def synthetic_safetensors(size_mb: float, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    remaining = int(size_mb * 1024 * 1024) // 4
+    header, blobs, offset, index = {}, [], 0, 0
+    while remaining > 0:
+        count = min(remaining, MAX_TENSOR_BYTES // 4)
+        blob = rng.standard_normal(count, dtype=np.float32).tobytes()
+        header[f"layers.{index}.weight"] = {"dtype": "F32", "shape": [count], "data_offsets": [offset, offset + len(blob)]}
+        blobs.append(blob)
+        offset += len(blob)
+        remaining -= count
+        index += 1
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b" " * (-len(header_bytes) % 8)
+    return struct.pack("<Q", len(header_bytes)) + header_bytes + b"".join(blobs)
+
+def run_client(port: int, rounds: int, payload: bytes, timings: Dict[str, List[float]],
+               update_ids: List[str], errors: List[str], lock: threading.Lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    try:
+        for _ in range(rounds):
+            cycle_start = time.perf_counter()
+
+            start = time.perf_counter()
+            status, body = request_json(port, "POST", "/api/v1/client/register",
+                                        {"experiment_id": EXPERIMENT_ID, "device_info": "benchmark"}, conn)
+            register_time = time.perf_counter() - start
+            if status != 200:
+                raise RuntimeError(f"register returned {status}")
+            client_id = body["client_id"]
+
+            start = time.perf_counter()
+            status, headers, model = request(port, "GET", f"/api/v1/client/model/latest?experiment_id={EXPERIMENT_ID}", conn=conn)
+            download_time = time.perf_counter() - start
+            if status != 200:
+                raise RuntimeError(f"model download returned {status}")
+
+            form, content_type = encode_multipart(
+                {"experiment_id": EXPERIMENT_ID, "client_id": client_id,
+                 "parent_model_version": headers.get("x-model-version", "1")},
+                {"adapter": ("adapter.safetensors", payload)},
+            )
+            start = time.perf_counter()
+            status, _, body = request(port, "POST", "/api/v1/client/update", form, {"Content-Type": content_type}, conn)
+            upload_time = time.perf_counter() - start
+            if status != 200:
+                raise RuntimeError(f"upload returned {status}")
+
+            with lock:
+                timings["register"].append(register_time)
+                timings["download"].append(download_time)
+                timings["upload"].append(upload_time)
+                timings["cycle"].append(time.perf_counter() - cycle_start)
+                update_ids.append(json.loads(body)["queued_update_id"])
+    except Exception as e:
+        with lock:
+            errors.append(str(e))
+    finally:
+        conn.close()
+
+def aggregate_when_validated(port: int, update_ids: List[str], timeout: float) -> float:
+    # The last uploads are still in the validation pool when the clients finish
+    deadline = time.time() + timeout
+    pending = list(update_ids)
+    while pending:
+        if time.time() > deadline:
+            raise RuntimeError(f"{len(pending)} updates still queued after {timeout}s")
+        pending = [uid for uid in pending
+                   if request_json(port, "GET", f"/api/v1/client/update/{uid}")[1]["status"] == "queued"]
+        if pending:
+            time.sleep(0.5)
+
+    status, body = request_json(port, "POST", f"/api/v1/experiments/{EXPERIMENT_ID}/aggregate")
+    if status != 200:
+        raise RuntimeError(f"aggregate returned {status}: {body}")
+    return body["duration_seconds"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent virtual clients")
+    parser.add_argument("--rounds", type=int, default=3, help="cycles per client")
+    parser.add_argument("--update-mb", type=float, default=10.0, help="size of the model and of every update")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--aggregate", action="store_true", help="time one aggregation of all uploads at the end")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare p99 latencies against a previous --json report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p99 regression vs baseline (fraction)")
+    args = parser.parse_args()
+
+    model = synthetic_safetensors(args.update_mb, args.seed)
+    # All clients send the same bytes; contents do not change the cost of validation or aggregation
+    payload = synthetic_safetensors(args.update_mb, args.seed + 1)
+
+    timings: Dict[str, List[float]] = {"register": [], "download": [], "upload": [], "cycle": []}
+    update_ids: List[str] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    with LocalServer(experiment_id=EXPERIMENT_ID) as server:
+        form, content_type = encode_multipart({}, {"model": ("model.safetensors", model)})
+        status, _, _ = request(server.port, "POST", f"/api/v1/experiments/{EXPERIMENT_ID}/models", form, {"Content-Type": content_type})
+        if status != 200:
+            sys.exit(f"Publishing the initial model failed with {status}")
+
+        with ResourceSampler(server.process.pid) as sampler:
+            start = time.perf_counter()
+            threads = [
+                threading.Thread(target=run_client, args=(server.port, args.rounds, payload, timings, update_ids, errors, lock))
+                for _ in range(args.clients)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+
+            aggregation_seconds = aggregate_when_validated(server.port, update_ids, timeout=600) if args.aggregate and not errors else None
+
+        cycles = len(timings["cycle"])
+        transferred = cycles * (len(model) + len(payload))
+        results = {
+            "cycles": cycles,
+            "errors": len(errors),
+            "elapsed_s": elapsed,
+            "cycles_per_s": cycles / elapsed if elapsed else 0.0,
+            "transfer_mb_per_s": transferred / elapsed / 2**20 if elapsed else 0.0,
+            "peak_rss_mb": sampler.peak_rss / 2**20,
+            "disk_read_mb": sampler.disk_read_bytes / 2**20,
+            "disk_write_mb": sampler.disk_write_bytes / 2**20,
+        }
+        for stage, samples in timings.items():
+            results[f"latency_{stage}"] = summarize(samples)
+        if aggregation_seconds is not None:
+            results["aggregation_s"] = aggregation_seconds
+
+    report = {"benchmark": "fl_cycle", "params": vars(args), "environment": environment_info(), "results": results}
+    print_report("FL client cycle", report)
+    for error in errors[:5]:
+        print(f"error: {error}")
+    write_report(args.json, report)
+    if errors or not compare_to_baseline(report, args.baseline, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import glob
+import http.client
+import json
+import math
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class LocalServer:
+    """Runs the backend under uvicorn from a throwaway copy of its sources, so the
+    database, storage and kernel workspaces of the benchmark never touch the real ones."""
+
+    def __init__(self, experiment_id: Optional[str] = None, keep: bool = False):
+        self.experiment_id = experiment_id
+        self.keep = keep
+        self.port = _free_port()
+        self.root: Optional[str] = None
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self):
+        self.root = tempfile.mkdtemp(prefix="fedaura-bench-")
+        for path in glob.glob(os.path.join(BACKEND_DIR, "*.py")):
+            shutil.copy(path, self.root)
+
+        if self.experiment_id:
+            # There is no API for creating experiments; seed the row like the seed_* scripts do
+            seed = (
+                "import models, database\n"
+                "models.Base.metadata.create_all(bind=database.engine)\n"
+                "db = database.SessionLocal()\n"
+                f"db.add(models.Experiment(id={self.experiment_id!r}, name='benchmark'))\n"
+                "db.commit()\n"
+            )
+            subprocess.run([sys.executable, "-c", seed], cwd=self.root, check=True)
+
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=self.root,
+        )
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                status, _, _ = request(self.port, "GET", "/api/notebooks")
+                if status == 200:
+                    return self
+            except OSError:
+                pass
+            if self.process.poll() is not None:
+                raise RuntimeError("Server exited during start-up")
+            time.sleep(0.2)
+        raise RuntimeError("Server did not become ready within 60s")
+
+    def __exit__(self, *exc):
+        if self.process:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.root and not self.keep:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+def request(port: int, method: str, path: str, body: Optional[bytes] = None,
+            headers: Optional[Dict[str, str]] = None, conn: Optional[http.client.HTTPConnection] = None) -> Tuple[int, Dict[str, str], bytes]:
+    own = conn is None
+    conn = conn or http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        res = conn.getresponse()
+        data = res.read()
+        return res.status, {k.lower(): v for k, v in res.getheaders()}, data
+    finally:
+        if own:
+            conn.close()
+
+def request_json(port: int, method: str, path: str, payload=None, conn=None):
+    body = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    status, _, data = request(port, method, path, body, headers, conn)
+    return status, json.loads(data) if data else None
+
+def encode_multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes]]) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode()
+        )
+        parts.append(content)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+def _process_tree(pid: int) -> List[int]:
+    if HAS_PSUTIL:
+        try:
+            root = psutil.Process(pid)
+            return [pid] + [child.pid for child in root.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+    # Linux fallback: rebuild the tree from /proc/<pid>/stat parent ids
+    parents = {}
+    for stat_path in glob.glob("/proc/[0-9]*/stat"):
+        try:
+            with open(stat_path) as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            parents[int(stat_path.split("/")[2])] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, frontier = [pid], [pid]
+    while frontier:
+        current = frontier.pop()
+        children = [p for p, parent in parents.items() if parent == current]
+        tree.extend(children)
+        frontier.extend(children)
+    return tree
+
+def _rss_bytes(pid: int) -> int:
+    if HAS_PSUTIL:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.NoSuchProcess:
+            return 0
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+def _io_bytes(pid: int) -> Tuple[int, int]:
+    if HAS_PSUTIL:
+        try:
+            counters = psutil.Process(pid).io_counters()
+            return counters.read_bytes, counters.write_bytes
+        except (psutil.NoSuchProcess, AttributeError, psutil.AccessDenied):
+            return 0, 0
+    try:
+        values = {}
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                values[key] = int(value)
+        return values.get("read_bytes", 0), values.get("write_bytes", 0)
+    except (OSError, ValueError):
+        return 0, 0
+
+class ResourceSampler:
+    """Samples RSS and disk I/O of the server and all of its children (validation and
+    aggregation workers, kernels). Short-lived children between samples are missed,
+    so I/O totals are a lower bound."""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self._io: Dict[int, Tuple[int, int]] = {}
+        self._baseline: Dict[int, Tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        tree = _process_tree(self.pid)
+        self.peak_rss = max(self.peak_rss, sum(_rss_bytes(pid) for pid in tree))
+        for pid in tree:
+            counters = _io_bytes(pid)
+            self._baseline.setdefault(pid, counters)
+            self._io[pid] = counters
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    @property
+    def disk_read_bytes(self) -> int:
+        return sum(self._io[pid][0] - self._baseline[pid][0] for pid in self._io)
+
+    @property
+    def disk_write_bytes(self) -> int:
+        return sum(self._io[pid][1] - self._baseline[pid][1] for pid in self._io)
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    def pct(p):
+        # Nearest-rank percentile
+        return ordered[max(0, math.ceil(p * len(ordered) / 100) - 1)]
+    return {
+        "count": len(ordered),
+        "mean_ms": 1000 * sum(ordered) / len(ordered),
+        "p50_ms": 1000 * pct(50),
+        "p99_ms": 1000 * pct(99),
+        "max_ms": 1000 * ordered[-1],
+    }
+
+def environment_info() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": str(os.cpu_count()),
+        "psutil": str(HAS_PSUTIL),
+    }
+
+def print_report(title: str, report: Dict):
+    print(f"\n== {title} ==")
+    for key, value in report.get("results", {}).items():
+        if isinstance(value, dict) and "p50_ms" in value:
+            print(f"{key:<28} n={value['count']:<6} p50={value['p50_ms']:9.2f}ms  p99={value['p99_ms']:9.2f}ms  max={value['max_ms']:9.2f}ms")
+        elif isinstance(value, float):
+            print(f"{key:<28} {value:.3f}")
+        else:
+            print(f"{key:<28} {value}")
+
+def write_report(path: Optional[str], report: Dict):
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+def compare_to_baseline(report: Dict, baseline_path: Optional[str], tolerance: float) -> bool:
+    """Flags p99 latencies that regressed by more than `tolerance` (a fraction) against a saved report."""
+    if not baseline_path:
+        return True
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    for key, value in report["results"].items():
+        previous = baseline.get("results", {}).get(key)
+        if not (isinstance(value, dict) and isinstance(previous, dict) and previous.get("p99_ms")):
+            continue
+        change = value["p99_ms"] / previous["p99_ms"] - 1
+        if change > tolerance:
+            print(f"REGRESSION {key}: p99 {previous['p99_ms']:.2f}ms -> {value['p99_ms']:.2f}ms (+{change:.0%})")
+            ok = False
+    return ok
@@ -0,0 +1,138 @@
+"""Benchmarks kernel spawn time and /api/notebooks/run latency and concurrency through RuntimeManager.
+
+Run from the backend directory:
+
+    python -m benchmarks.notebook_runtime --notebooks 8 --runs 50 --cells 100 --json nb.json
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+from benchmarks.harness import (
+    LocalServer, ResourceSampler, compare_to_baseline, environment_info, print_report,
+    request, request_json, summarize, write_report,
+)
+
+def run_cells(port: int, notebook_id: str, code: str, runs: int, samples: List[float], errors: List[str], lock: threading.Lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            status, body = request_json(port, "POST", "/api/notebooks/run", {"notebook_id": notebook_id, "code": code}, conn)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status != 200 or body.get("error"):
+                    errors.append(f"{status}: {body.get('error') if body else ''}")
+                else:
+                    samples.append(elapsed)
+    finally:
+        conn.close()
+
+def run_concurrently(port: int, notebook_ids: List[str], code: str, runs: int, errors: List[str]):
+    samples: List[float] = []
+    lock = threading.Lock()
+    threads = [threading.Thread(target=run_cells, args=(port, nb, code, runs, samples, errors, lock)) for nb in notebook_ids]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - start
+
+def run_notebook(port: int, notebook_id: str, code: str, cells: int, repeats: int, errors: List[str]):
+    """Times a notebook of `cells` identical cells run one request per cell and as one run-all batch."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    sequential, batched = [], []
+    payload = {"cells": [{"id": f"c{i}", "type": "code", "content": code} for i in range(cells)]}
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(cells):
+                status, _ = request_json(port, "POST", "/api/notebooks/run", {"notebook_id": notebook_id, "code": code}, conn)
+                if status != 200:
+                    errors.append(f"run returned {status}")
+            sequential.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            status, _, body = request(port, "POST", f"/api/notebooks/{notebook_id}/run-all", json.dumps(payload).encode(),
+                                      {"Content-Type": "application/json"}, conn)
+            batched.append(time.perf_counter() - start)
+            summary = json.loads(body.splitlines()[-1]) if status == 200 else {}
+            if summary.get("executed") != cells:
+                errors.append(f"run-all returned {status}: {summary}")
+    finally:
+        conn.close()
+    return sequential, batched
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notebooks", type=int, default=4, help="notebooks (kernels) executing concurrently")
+    parser.add_argument("--runs", type=int, default=20, help="executions per notebook in the concurrency phases")
+    parser.add_argument("--cells", type=int, default=50, help="cells per notebook in the run-all phase")
+    parser.add_argument("--code", default="x = sum(range(10000))\nprint(x)", help="cell source to execute")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare p99 latencies against a previous --json report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p99 regression vs baseline (fraction)")
+    args = parser.parse_args()
+
+    errors: List[str] = []
+    results: Dict = {}
+    notebook_ids = [f"bench-{uuid.uuid4()}" for _ in range(args.notebooks)]
+
+    with LocalServer() as server:
+        port = server.port
+        with ResourceSampler(server.process.pid) as sampler:
+            # Cold start: the first run of a notebook spawns its kernel
+            cold = []
+            for nb in notebook_ids:
+                start = time.perf_counter()
+                status, _ = request_json(port, "POST", "/api/notebooks/run", {"notebook_id": nb, "code": "pass"})
+                cold.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(f"cold start returned {status}")
+            results["kernel_cold_start"] = summarize(cold)
+
+            restarts = []
+            for nb in notebook_ids:
+                start = time.perf_counter()
+                status, _ = request_json(port, "POST", f"/api/notebooks/{nb}/restart")
+                restarts.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(f"restart returned {status}")
+            results["kernel_restart"] = summarize(restarts)
+
+            # One client per kernel: measures per-execution overhead and cross-kernel scaling
+            samples, elapsed = run_concurrently(port, notebook_ids, args.code, args.runs, errors)
+            results["run_parallel_kernels"] = summarize(samples)
+            results["run_parallel_per_s"] = len(samples) / elapsed if elapsed else 0.0
+
+            # Many clients on one kernel: executions serialize on the session lock
+            samples, elapsed = run_concurrently(port, [notebook_ids[0]] * args.notebooks, args.code, args.runs, errors)
+            results["run_shared_kernel"] = summarize(samples)
+            results["run_shared_per_s"] = len(samples) / elapsed if elapsed else 0.0
+
+            # Whole notebook: per-cell requests vs one batch round trip
+            sequential, batched = run_notebook(port, notebook_ids[0], args.code, args.cells, 5, errors)
+            results["notebook_sequential"] = summarize(sequential)
+            results["notebook_run_all"] = summarize(batched)
+
+        results["errors"] = len(errors)
+        results["peak_rss_mb"] = sampler.peak_rss / 2**20
+        results["disk_read_mb"] = sampler.disk_read_bytes / 2**20
+        results["disk_write_mb"] = sampler.disk_write_bytes / 2**20
+
+    report = {"benchmark": "notebook_runtime", "params": vars(args), "environment": environment_info(), "results": results}
+    print_report("Notebook runtime", report)
+    for error in errors[:5]:
+        print(f"error: {error}")
+    write_report(args.json, report)
+    if errors or not compare_to_baseline(report, args.baseline, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import hashlib
+import os
+from typing import AsyncIterator, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+# Clients pick their own chunk size up to this limit; the default is a hint returned on session creation
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MAX_UPLOAD_SIZE = 4 * 1024 * 1024 * 1024
+# Request body pieces are gathered up to this size before being written off the event loop
+WRITE_BATCH_SIZE = 1024 * 1024
+
+class ChunkTooLargeError(Exception):
+    pass
+
+def partial_path(uploads_dir: str, upload_id: str) -> str:
+    return os.path.join(uploads_dir, f"{upload_id}.part")
+
+def preallocate(path: str, size: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if hasattr(os, "posix_fallocate") and size > 0:
+            # Reserve the blocks up front so a full disk fails here, not halfway through the upload
+            os.posix_fallocate(fd, 0, size)
+        else:
+            os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+def _pwrite_all(fd: int, data: bytes, offset: int, digest) -> int:
+    view = memoryview(data)
+    digest.update(view)
+    while view:
+        n = os.pwrite(fd, view, offset)
+        view = view[n:]
+        offset += n
+    return len(data)
+
+async def write_chunk(stream: AsyncIterator[bytes], path: str, offset: int, limit: int) -> Tuple[int, str]:
+    """Writes the request body straight into the preallocated file at `offset`.
+    Returns (bytes written, sha256 hex of the chunk). Nothing is committed here:
+    the caller only advances the session offset once the checksum matches.
+
+    Only the stream is read on the event loop; hashing, pwrite and fsync run in the
+    threadpool, in WRITE_BATCH_SIZE pieces to keep thread hand-offs rare."""
+    digest = hashlib.sha256()
+    written = 0
+    pending = []
+    pending_size = 0
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        async for piece in stream:
+            if not piece:
+                continue
+            if written + pending_size + len(piece) > limit:
+                raise ChunkTooLargeError(f"Chunk exceeds {limit} bytes")
+            pending.append(piece)
+            pending_size += len(piece)
+            if pending_size >= WRITE_BATCH_SIZE:
+                written += await run_in_threadpool(_pwrite_all, fd, b"".join(pending), offset + written, digest)
+                pending, pending_size = [], 0
+        if pending:
+            written += await run_in_threadpool(_pwrite_all, fd, b"".join(pending), offset + written, digest)
+        if written:
+            await run_in_threadpool(os.fsync, fd)
+    finally:
+        os.close(fd)
+    return written, digest.hexdigest()
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(DEFAULT_CHUNK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
@@ -17,3 +17,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def add_missing_columns(table):
+    """create_all never alters existing tables, so columns added to a model later are added here.
+    Idempotent; only nullable columns without server defaults can be added this way in SQLite."""
+    with engine.begin() as conn:
+        existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
@@ -44,6 +44,137 @@ def get_plots():
         pass
     return plots
 
+def run_profiled(code, top_n, profile):
+    """Executes the cell under cProfile and tracemalloc, filling `profile` even if the cell raises."""
+    import cProfile
+    import pstats
+    import time
+    import tracemalloc
+
+    compiled = compile(code, "<cell>", "exec")
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        profiler.enable()
+        try:
+            exec(compiled, globals_dict)
+        finally:
+            profiler.disable()
+    finally:
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        if not already_tracing:
+            tracemalloc.stop()
+
+        stats = pstats.Stats(profiler).stats
+        hotspots = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+        allocations = snapshot.statistics("lineno")[:top_n]
+
+        profile.update({
+            "wall_time": wall_time,
+            "cpu_time": cpu_time,
+            "peak_memory_bytes": peak,
+            "hotspots": [
+                {
+                    "function": func,
+                    "file": filename,
+                    "line": line,
+                    "calls": calls,
+                    "self_time": self_time,
+                    "cumulative_time": cumulative_time,
+                }
+                for (filename, line, func), (_, calls, self_time, cumulative_time, _) in hotspots
+            ],
+            "allocations": [
+                {
+                    "file": stat.traceback[0].filename,
+                    "line": stat.traceback[0].lineno,
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                }
+                for stat in allocations
+            ],
+        })
+
+def run_cell(code, profile_options=None):
+    # Special handling for ! commands (shell)
+    if code.strip().startswith('!'):
+        import subprocess
+        import importlib
+        shell_cmd = code.strip()[1:]
+        
+        # If command is pip, force use of the current python executable
+        if shell_cmd.startswith('pip '):
+            # Replace 'pip ' with '{sys.executable} -m pip '
+            shell_cmd = f'"{sys.executable}" -m ' + shell_cmd
+
+        result = subprocess.run(shell_cmd, shell=True, capture_output=True, text=True)
+        
+        # Invalidate caches so newly installed packages are importable immediately
+        importlib.invalidate_caches()
+        
+        return {
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "plots": []
+        }
+
+    stdout_buf = io.StringIO()
+    stderr_buf = io.StringIO()
+    
+    error = None
+    profile = {} if profile_options else None
+    try:
+        with redirect_stdout(stdout_buf), redirect_stderr(stderr_buf):
+            if profile_options:
+                run_profiled(code, profile_options.get("top_n", 15), profile)
+            else:
+                # We use exec with the same globals_dict every time
+                # To support returning the last expression like a REPL, 
+                # we could try to compile it as 'single', but 'exec' is safer for multi-line blocks.
+                exec(code, globals_dict)
+    except Exception:
+        error = traceback.format_exc()
+
+    plots = get_plots()
+
+    response = {
+        "stdout": stdout_buf.getvalue(),
+        "stderr": stderr_buf.getvalue(),
+        "error": error,
+        "plots": plots
+    }
+    if profile:
+        response["profile"] = profile
+    return response
+
+def run_batch(cells, stop_on_error):
+    """Runs cells in order, writing one result line per cell as soon as it finishes and a
+    closing {"batch_done": true} line, so the host can stream results and knows where the batch ends."""
+    for cell in cells:
+        try:
+            response = run_cell(cell.get("code", ""))
+        except Exception as e:
+            # Keep the batch framing intact so the host is not left waiting for batch_done
+            response = {"error": f"Kernel Internal Error: {str(e)}", "stdout": "", "stderr": ""}
+        response["cell_id"] = cell.get("id")
+        print(json.dumps(response))
+        sys.stdout.flush()
+        if stop_on_error and response.get("error"):
+            break
+    print(json.dumps({"batch_done": True}))
+    sys.stdout.flush()
+
 def main():
     # Initial setup: move to workspace if provided as argument
     if len(sys.argv) > 1:
@@ -62,55 +193,11 @@ def main():
                 break
             
             data = json.loads(line)
-            code = data.get("code", "")
-            
-            # Special handling for ! commands (shell)
-            if code.strip().startswith('!'):
-                import subprocess
-                import importlib
-                shell_cmd = code.strip()[1:]
-                
-                # If command is pip, force use of the current python executable
-                if shell_cmd.startswith('pip '):
-                    # Replace 'pip ' with '{sys.executable} -m pip '
-                    shell_cmd = f'"{sys.executable}" -m ' + shell_cmd
-
-                result = subprocess.run(shell_cmd, shell=True, capture_output=True, text=True)
-                
-                # Invalidate caches so newly installed packages are importable immediately
-                importlib.invalidate_caches()
-                
-                print(json.dumps({
-                    "stdout": result.stdout,
-                    "stderr": result.stderr,
-                    "plots": []
-                }))
-                sys.stdout.flush()
+            if "batch" in data:
+                run_batch(data["batch"], data.get("stop_on_error", True))
                 continue
 
-            stdout_buf = io.StringIO()
-            stderr_buf = io.StringIO()
-            
-            error = None
-            try:
-                with redirect_stdout(stdout_buf), redirect_stderr(stderr_buf):
-                    # We use exec with the same globals_dict every time
-                    # To support returning the last expression like a REPL, 
-                    # we could try to compile it as 'single', but 'exec' is safer for multi-line blocks.
-                    exec(code, globals_dict)
-            except Exception:
-                error = traceback.format_exc()
-
-            plots = get_plots()
-
-            response = {
-                "stdout": stdout_buf.getvalue(),
-                "stderr": stderr_buf.getvalue(),
-                "error": error,
-                "plots": plots
-            }
-            
-            print(json.dumps(response))
+            print(json.dumps(run_cell(data.get("code", ""), data.get("profile"))))
             sys.stdout.flush()
             
         except Exception as e:
@@ -1,14 +1,28 @@
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Response
+from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Response, Request, Header, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from concurrent.futures.process import BrokenProcessPool
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
+import datetime
 import uuid
 import os
+import shutil
+import time
+import threading
 
-import models, schemas, database, runtime_manager
+import models, schemas, database, runtime_manager, update_validator, chunked_upload, model_store, aggregator, storage_lifecycle, metrics, notebook_deps
 
 # Initialize database
 models.Base.metadata.create_all(bind=database.engine)
+# Databases created before updates were validated, aggregated and archived lack these columns
+database.add_missing_columns(models.ModelUpdate.__table__)
+
+STORAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage")
+# Pre-versioning single global model, imported into the store on first start
+LEGACY_MODEL_PATH = os.path.join(STORAGE_PATH, "models", "latest.safetensors")
+UPLOADS_PATH = os.path.join(STORAGE_PATH, "uploads")
 
 app = FastAPI(title="FedAura Notebook API")
 
@@ -19,8 +33,108 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-MODEL-VERSION", "X-BASE-MODEL-ID"],
+    expose_headers=["X-MODEL-VERSION", "X-BASE-MODEL-ID", "X-MODEL-SHA256", "ETag"],
+)
+
+# --- Metrics ---
+
+REQUEST_SECONDS = metrics.Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route", "status"]
+)
+UPLOAD_BYTES = metrics.Counter(
+    "update_upload_bytes_total", "Bytes of model updates received", ["protocol"]
 )
+UPLOAD_THROUGHPUT = metrics.Histogram(
+    "update_upload_throughput_bytes_per_second", "Per-request upload throughput", ["protocol"],
+    buckets=(1e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8, 2.5e8, 5e8, 1e9)
+)
+AGGREGATION_SECONDS = metrics.Histogram(
+    "aggregation_duration_seconds", "Wall-clock time to aggregate and publish a round"
+)
+
+def queued_updates_per_experiment():
+    db = database.SessionLocal()
+    try:
+        rows = db.query(models.ModelUpdate.experiment_id, func.count(models.ModelUpdate.id)).filter(
+            models.ModelUpdate.status == "queued"
+        ).group_by(models.ModelUpdate.experiment_id).all()
+        return {(experiment_id,): count for experiment_id, count in rows}
+    finally:
+        db.close()
+
+metrics.Gauge("updates_queued", "Updates waiting for validation, per experiment", ["experiment_id"], fn=queued_updates_per_experiment)
+
+class RequestLatencyMiddleware:
+    """Plain ASGI middleware: times each request until its last body message is sent,
+    so streamed responses (model downloads, run-all) are measured in full."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        # Exposed as request.state.started, e.g. for upload throughput
+        scope = {**scope, "state": {**scope.get("state", {}), "started": started}}
+        status = 500
+        recorded = False
+
+        def observe():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route.path if route else "unmatched",
+                status=str(status)
+            )
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Errors and client disconnects never send the final body message
+            observe()
+
+app.add_middleware(RequestLatencyMiddleware)
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.on_event("startup")
+def requeue_pending_updates():
+    db = database.SessionLocal()
+    try:
+        model_store.store.import_legacy(db, LEGACY_MODEL_PATH)
+
+        # Updates accepted before a restart never got a validation verdict
+        pending = db.query(models.ModelUpdate).filter(models.ModelUpdate.status == "queued").all()
+        for update in pending:
+            submit_for_validation(db, update, storage_lifecycle.lifecycle.locate_update(update.id))
+    finally:
+        db.close()
+
+    storage_lifecycle.lifecycle.start()
+
+@app.on_event("shutdown")
+def shutdown_worker_pools():
+    update_validator.validator.shutdown(wait=True)
+    aggregator.aggregator.shutdown(wait=True)
 
 # Dependency
 def get_db():
@@ -77,17 +191,150 @@ def delete_notebook(notebook_id: str, db: Session = Depends(get_db)):
 
 # --- Execution ---
 
-@app.post("/api/notebooks/run", response_model=schemas.ExecutionResponse)
-def run_code(request: schemas.ExecutionRequest):
-    session = runtime_manager.manager.get_session(request.notebook_id)
-    result = session.execute(request.code)
+def execution_response(result: dict):
     return schemas.ExecutionResponse(
         stdout=result.get("stdout", ""),
         stderr=result.get("stderr"),
         error=result.get("error"),
-        plots=result.get("plots", [])
+        plots=result.get("plots", []),
+        profile=result.get("profile")
+    )
+
+@app.post("/api/notebooks/run", response_model=schemas.ExecutionResponse)
+def run_code(request: schemas.ExecutionRequest):
+    session = runtime_manager.manager.get_session(request.notebook_id)
+    session.forget_cells_touching(notebook_deps.names_written(request.code))
+    result = session.execute(request.code, profile_top_n=request.profile_top_n if request.profile else None)
+    return execution_response(result)
+
+def get_notebook_or_404(db: Session, notebook_id: str) -> models.Notebook:
+    db_notebook = db.query(models.Notebook).filter(models.Notebook.id == notebook_id).first()
+    if not db_notebook:
+        raise HTTPException(status_code=404, detail="Notebook not found")
+    return db_notebook
+
+@app.get("/api/notebooks/{notebook_id}/dependencies", response_model=schemas.NotebookDependencies)
+def get_notebook_dependencies(notebook_id: str, db: Session = Depends(get_db)):
+    db_notebook = get_notebook_or_404(db, notebook_id)
+    # Don't spawn a kernel just to report staleness; without one every cell is stale
+    session = runtime_manager.manager.sessions.get(notebook_id)
+    plans = notebook_deps.build_plan(db_notebook.cells or [], session.executed_cells if session else {})
+    return schemas.NotebookDependencies(
+        notebook_id=notebook_id,
+        cells=[
+            schemas.CellDependency(
+                cell_id=plan.cell_id,
+                defines=sorted(plan.symbols.defines),
+                uses=sorted(plan.symbols.uses),
+                depends_on=plan.depends_on,
+                deterministic=plan.symbols.deterministic,
+                stale=plan.stale,
+                reason=plan.reason
+            )
+            for plan in plans
+        ]
     )
 
+@app.post("/api/notebooks/{notebook_id}/run-stale", response_model=schemas.RunStaleResponse)
+def run_stale_cells(notebook_id: str, db: Session = Depends(get_db)):
+    db_notebook = get_notebook_or_404(db, notebook_id)
+    cells = {cell["id"]: cell for cell in db_notebook.cells or []}
+    session = runtime_manager.manager.get_session(notebook_id)
+    plans = notebook_deps.build_plan(list(cells.values()), session.executed_cells)
+
+    results = []
+    failed = set()
+    for plan in plans:
+        if not plan.stale and plan.fingerprint in session.cell_outputs:
+            results.append(schemas.CellRunResult(
+                cell_id=plan.cell_id, status="cached", result=execution_response(session.cell_outputs[plan.fingerprint])
+            ))
+            continue
+        # Cells downstream of a failure would run against missing or outdated state
+        if failed.intersection(plan.depends_on):
+            failed.add(plan.cell_id)
+            results.append(schemas.CellRunResult(cell_id=plan.cell_id, status="skipped"))
+            continue
+
+        result = session.execute(cells[plan.cell_id].get("content") or "")
+        if result.get("error"):
+            session.forget_cell(plan.cell_id)
+            failed.add(plan.cell_id)
+            status = "error"
+        else:
+            session.record_cell(plan.cell_id, plan.fingerprint, plan.symbols.defines | plan.symbols.uses, result)
+            status = "executed"
+        results.append(schemas.CellRunResult(cell_id=plan.cell_id, status=status, result=execution_response(result)))
+
+    return schemas.RunStaleResponse(notebook_id=notebook_id, results=results)
+
+@app.post("/api/notebooks/{notebook_id}/run-all")
+def run_all_cells(notebook_id: str, request: Optional[schemas.BatchRunRequest] = None, db: Session = Depends(get_db)):
+    """Runs the code cells in one kernel round trip and streams one CellRunResult per
+    line (NDJSON) as each cell finishes, followed by a BatchRunSummary line."""
+    request = request or schemas.BatchRunRequest()
+    if request.cells is None or request.save_outputs:
+        db_notebook = get_notebook_or_404(db, notebook_id)
+    cells = [cell.dict() for cell in request.cells] if request.cells is not None else db_notebook.cells or []
+    code_cells = [cell for cell in cells if cell.get("type") == "code"]
+    plans = {plan.cell_id: plan for plan in notebook_deps.build_plan(code_cells, {})}
+    session = runtime_manager.manager.get_session(notebook_id)
+
+    def stream():
+        started = time.time()
+        written = set()
+        for plan in plans.values():
+            written |= plan.symbols.written
+        session.forget_cells_touching(written)
+
+        outputs = {}
+        batch = [{"id": cell["id"], "code": cell.get("content") or ""} for cell in code_cells]
+        for result in session.execute_batch(batch, stop_on_error=request.stop_on_error):
+            cell_id = result.pop("cell_id", None)
+            outputs[cell_id] = result
+            plan = plans.get(cell_id)
+            if result.get("error"):
+                session.forget_cell(cell_id)
+                status = "error"
+            else:
+                # Lets a later run-stale reuse these results
+                if plan:
+                    session.record_cell(cell_id, plan.fingerprint, plan.symbols.defines | plan.symbols.uses, result)
+                status = "executed"
+            yield schemas.CellRunResult(cell_id=cell_id, status=status, result=execution_response(result)).json() + "\n"
+
+        skipped = [cell["id"] for cell in code_cells if cell["id"] not in outputs]
+        for cell_id in skipped:
+            yield schemas.CellRunResult(cell_id=cell_id, status="skipped").json() + "\n"
+
+        saved = request.save_outputs and bool(outputs) and save_cell_outputs(notebook_id, outputs)
+        yield schemas.BatchRunSummary(
+            notebook_id=notebook_id,
+            executed=sum(1 for r in outputs.values() if not r.get("error")),
+            errors=sum(1 for r in outputs.values() if r.get("error")),
+            skipped=len(skipped),
+            saved=saved,
+            duration_seconds=time.time() - started
+        ).json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+def save_cell_outputs(notebook_id: str, outputs: dict) -> bool:
+    # Runs after the request's own session has closed, so it opens one for the single write
+    db = database.SessionLocal()
+    try:
+        db_notebook = db.query(models.Notebook).filter(models.Notebook.id == notebook_id).first()
+        if not db_notebook:
+            return False
+        db_notebook.cells = [
+            {**cell, "output": outputs[cell["id"]]} if cell.get("id") in outputs else cell
+            for cell in db_notebook.cells or []
+        ]
+        db.commit()
+        return True
+    finally:
+        db.close()
+
 @app.post("/api/v1/client/register", response_model=schemas.ClientRegisterResponse)
 def register_client(request: schemas.ClientRegisterRequest, db: Session = Depends(get_db)):
     exp = db.query(models.Experiment).filter(models.Experiment.id == request.experiment_id).first()
@@ -111,29 +358,73 @@ def register_client(request: schemas.ClientRegisterRequest, db: Session = Depend
     )
 
 @app.get("/api/v1/client/model/latest")
-def get_latest_model(experiment_id: str, db: Session = Depends(get_db)):
+def get_latest_model(
+    experiment_id: str,
+    version: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     exp = db.query(models.Experiment).filter(models.Experiment.id == experiment_id).first()
     if not exp:
         raise HTTPException(status_code=404, detail="Experiment not found")
     
-    # In a real app, this would return a specific file for the experiment
-    if not os.path.exists(DUMMY_MODEL_PATH):
+    # Stale clients may ask for the parent version they trained against
+    requested_version = version if version is not None else exp.current_model_version
+    record = model_store.store.get_version(db, experiment_id, requested_version)
+    if not record:
         raise HTTPException(status_code=404, detail="Model file not found")
-    
-    with open(DUMMY_MODEL_PATH, "rb") as f:
-        content = f.read()
-    
-    return Response(
-        content=content,
-        media_type="application/octet-stream",
-        headers={
-            "X-MODEL-VERSION": str(exp.current_model_version),
-            "X-BASE-MODEL-ID": exp.base_model_id
-        }
+
+    headers = {
+        "X-MODEL-VERSION": str(record.version),
+        "X-BASE-MODEL-ID": exp.base_model_id,
+        "X-MODEL-SHA256": record.sha256,
+        "ETag": f'"{record.sha256}"'
+    }
+    if if_none_match and if_none_match.strip('"') == record.sha256:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        hot = model_store.store.open_version(record)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Model file not found")
+
+    headers["Content-Length"] = str(hot.size)
+    return StreamingResponse(hot.iter_chunks(), media_type="application/octet-stream", headers=headers)
+
+@app.post("/api/v1/experiments/{experiment_id}/models", response_model=schemas.ModelVersionResponse)
+def publish_model(experiment_id: str, model: UploadFile = File(...), db: Session = Depends(get_db)):
+    # Sync on purpose: spooling, hashing and fsyncing a large model runs in the threadpool,
+    # not on the event loop that is streaming model downloads
+    exp = db.query(models.Experiment).filter(models.Experiment.id == experiment_id).first()
+    if not exp:
+        raise HTTPException(status_code=404, detail="Experiment not found")
+
+    # Spool to a temp file first; the store then copies, hashes and atomically renames it
+    tmp_path = os.path.join(UPLOADS_PATH, f"{uuid.uuid4()}.model")
+    os.makedirs(UPLOADS_PATH, exist_ok=True)
+    try:
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(model.file, f, 1024 * 1024)
+        # Updates are validated against the current version, so it must be well-formed itself
+        try:
+            update_validator.read_safetensors_header(tmp_path)
+        except update_validator.InvalidUpdateError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid model: {e}")
+        record = model_store.store.publish(db, experiment_id, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return schemas.ModelVersionResponse(
+        experiment_id=record.experiment_id,
+        version=record.version,
+        sha256=record.sha256,
+        size=record.size
     )
 
 @app.post("/api/v1/client/update", response_model=schemas.UpdateResponse)
 async def upload_update(
+    request: Request,
     experiment_id: str = Form(...),
     client_id: str = Form(...),
     parent_model_version: int = Form(...),
@@ -145,30 +436,280 @@ async def upload_update(
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    # Save the adapter file
+    # Stream the adapter to disk instead of buffering it whole in memory
     update_id = str(uuid.uuid4())
-    save_path = os.path.join(STORAGE_PATH, "updates", f"{update_id}.safetensors")
-    with open(save_path, "wb") as f:
-        f.write(await adapter.read())
+    save_path = storage_lifecycle.lifecycle.update_path(update_id)
+    size = 0
+    with storage_lifecycle.lifecycle.create_update_file(update_id) as f:
+        while chunk := await adapter.read(1024 * 1024):
+            f.write(chunk)
+            size += len(chunk)
+
+    # Measured from the start of the request, so it includes receiving the multipart body
+    UPLOAD_BYTES.inc(size, protocol="multipart")
+    UPLOAD_THROUGHPUT.observe(size / max(time.perf_counter() - request.state.started, 1e-9), protocol="multipart")
     
+    return queue_update(db, update_id, client_id, experiment_id, parent_model_version, save_path)
+
+def queue_update(db: Session, update_id: str, client_id: str, experiment_id: str, parent_model_version: int, save_path: str):
     # Create database entry
     update = models.ModelUpdate(
         id=update_id,
         client_id=client_id,
         experiment_id=experiment_id,
         parent_model_version=parent_model_version,
-        l2_norm=1.0, # Dummy norm calculation
+        l2_norm=1.0, # Placeholder until validation computes the real norm
         status="queued"
     )
     db.add(update)
     db.commit()
-    
+
+    submit_for_validation(db, update, save_path)
+
     return schemas.UpdateResponse(
-        status="queued",
+        status="rejected" if update.status == "rejected" else "queued",
         queued_update_id=update_id,
         l2_norm=1.0
     )
 
+def submit_for_validation(db: Session, update: models.ModelUpdate, path: str):
+    # The layout is checked against the version the client trained from, which may no longer be current
+    reference = model_store.store.get_version(db, update.experiment_id, update.parent_model_version)
+    if reference is None:
+        update.status = "rejected"
+        update.rejection_reason = f"Model version {update.parent_model_version} is not published for this experiment"
+        db.commit()
+        return
+    # Header, layout and NaN/Inf checks run in the process pool, off the request path
+    update_validator.validator.submit(update.id, path, reference.path)
+
+@app.get("/api/v1/client/update/{update_id}", response_model=schemas.UpdateStatusResponse)
+def get_update_status(update_id: str, db: Session = Depends(get_db)):
+    update = db.query(models.ModelUpdate).filter(models.ModelUpdate.id == update_id).first()
+    if not update:
+        raise HTTPException(status_code=404, detail="Update not found")
+    return schemas.UpdateStatusResponse(
+        update_id=update.id,
+        status=update.status,
+        l2_norm=update.l2_norm if update.status not in ("queued", "rejected") else None,
+        rejection_reason=update.rejection_reason
+    )
+
+# --- Aggregation ---
+
+# One aggregation per experiment at a time; concurrent ones would build two versions from the same round
+aggregation_locks: Dict[str, threading.Lock] = {}
+aggregation_locks_guard = threading.Lock()
+
+@app.post("/api/v1/experiments/{experiment_id}/aggregate", response_model=schemas.AggregationResponse)
+def aggregate_round(experiment_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    with aggregation_locks_guard:
+        lock = aggregation_locks.setdefault(experiment_id, threading.Lock())
+    if not lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="An aggregation is already running for this experiment")
+    try:
+        record, updates, duration = aggregate_validated_updates(db, experiment_id)
+    finally:
+        lock.release()
+
+    # The round's files are no longer needed individually; pack them after responding
+    background_tasks.add_task(compact_round, experiment_id, record.version)
+
+    return schemas.AggregationResponse(
+        experiment_id=experiment_id,
+        version=record.version,
+        sha256=record.sha256,
+        num_updates=len(updates),
+        duration_seconds=duration
+    )
+
+def aggregate_validated_updates(db: Session, experiment_id: str):
+    exp = db.query(models.Experiment).filter(models.Experiment.id == experiment_id).first()
+    if not exp:
+        raise HTTPException(status_code=404, detail="Experiment not found")
+
+    updates = db.query(models.ModelUpdate).filter(
+        models.ModelUpdate.experiment_id == experiment_id,
+        models.ModelUpdate.status == "validated",
+        models.ModelUpdate.parent_model_version == exp.current_model_version
+    ).all()
+    if not updates:
+        raise HTTPException(status_code=409, detail="No validated updates for the current model version")
+
+    update_paths = [storage_lifecycle.lifecycle.locate_update(update.id) for update in updates]
+    # Written next to the model store so publishing is a rename, not a copy
+    output_path = os.path.join(model_store.store.root, f"aggregate-{uuid.uuid4()}.tmp")
+
+    start = time.perf_counter()
+    try:
+        aggregator.aggregator.aggregate(update_paths, output_path, method=exp.aggregation_method)
+        record = model_store.store.publish(db, experiment_id, output_path, move=True)
+    except (ValueError, update_validator.InvalidUpdateError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except BrokenProcessPool:
+        # The updates stay validated, so the round can simply be retried
+        raise HTTPException(status_code=503, detail="An aggregation worker crashed; retry the aggregation")
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    duration = time.perf_counter() - start
+    AGGREGATION_SECONDS.observe(duration)
+
+    aggregated_at = datetime.datetime.utcnow()
+    for update in updates:
+        update.status = "aggregated"
+        update.aggregated_into_version = record.version
+        update.aggregated_at = aggregated_at
+    db.commit()
+
+    return record, updates, duration
+
+def compact_round(experiment_id: str, version: int):
+    db = database.SessionLocal()
+    try:
+        storage_lifecycle.lifecycle.compact_round(db, experiment_id, version)
+    finally:
+        db.close()
+
+@app.post("/api/v1/storage/gc")
+def collect_storage_garbage(db: Session = Depends(get_db)):
+    return storage_lifecycle.lifecycle.collect_garbage(db)
+
+# --- Resumable Uploads ---
+
+def get_upload_session(db: Session, upload_id: str) -> models.UploadSession:
+    upload = db.query(models.UploadSession).filter(models.UploadSession.id == upload_id).first()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload
+
+def upload_session_response(upload: models.UploadSession):
+    return schemas.UploadSessionResponse(
+        upload_id=upload.id,
+        status=upload.status,
+        total_size=upload.total_size,
+        committed_offset=upload.committed_offset,
+        chunk_size=chunked_upload.DEFAULT_CHUNK_SIZE
+    )
+
+@app.post("/api/v1/client/uploads", response_model=schemas.UploadSessionResponse)
+def create_upload_session(request: schemas.UploadSessionCreate, db: Session = Depends(get_db)):
+    client = db.query(models.Client).filter(models.Client.id == request.client_id).first()
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    if request.total_size <= 0 or request.total_size > chunked_upload.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail="Invalid upload size")
+
+    upload = models.UploadSession(
+        client_id=request.client_id,
+        experiment_id=request.experiment_id,
+        parent_model_version=request.parent_model_version,
+        total_size=request.total_size,
+        committed_offset=0,
+        sha256=request.sha256.lower() if request.sha256 else None,
+        status="open"
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    try:
+        chunked_upload.preallocate(chunked_upload.partial_path(UPLOADS_PATH, upload.id), upload.total_size)
+    except OSError:
+        db.delete(upload)
+        db.commit()
+        raise HTTPException(status_code=507, detail="Not enough storage for upload")
+
+    return upload_session_response(upload)
+
+@app.get("/api/v1/client/uploads/{upload_id}", response_model=schemas.UploadSessionResponse)
+def get_upload_offset(upload_id: str, db: Session = Depends(get_db)):
+    return upload_session_response(get_upload_session(db, upload_id))
+
+@app.put("/api/v1/client/uploads/{upload_id}", response_model=schemas.UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    x_chunk_sha256: str = Header(...),
+    db: Session = Depends(get_db)
+):
+    upload = get_upload_session(db, upload_id)
+    if upload.status != "open":
+        raise HTTPException(status_code=409, detail="Upload session is already finalized")
+
+    # Retransmission of an already committed chunk is a no-op; skipping ahead is not allowed
+    if upload_offset < upload.committed_offset:
+        return upload_session_response(upload)
+    if upload_offset > upload.committed_offset:
+        raise HTTPException(status_code=409, detail=f"Expected offset {upload.committed_offset}")
+
+    limit = min(chunked_upload.MAX_CHUNK_SIZE, upload.total_size - upload_offset)
+    path = chunked_upload.partial_path(UPLOADS_PATH, upload_id)
+    started = time.perf_counter()
+    try:
+        written, digest = await chunked_upload.write_chunk(request.stream(), path, upload_offset, limit)
+    except chunked_upload.ChunkTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    UPLOAD_BYTES.inc(written, protocol="chunked")
+    UPLOAD_THROUGHPUT.observe(written / max(time.perf_counter() - started, 1e-9), protocol="chunked")
+
+    if written == 0:
+        raise HTTPException(status_code=400, detail="Empty chunk")
+    if digest != x_chunk_sha256.lower():
+        raise HTTPException(status_code=422, detail="Chunk checksum mismatch")
+
+    # Conditional update so two racing PUTs for the same offset commit at most once
+    committed = db.query(models.UploadSession).filter(
+        models.UploadSession.id == upload_id,
+        models.UploadSession.committed_offset == upload_offset
+    ).update({models.UploadSession.committed_offset: upload_offset + written}, synchronize_session=False)
+    db.commit()
+    db.refresh(upload)
+    if not committed:
+        raise HTTPException(status_code=409, detail=f"Expected offset {upload.committed_offset}")
+
+    return upload_session_response(upload)
+
+@app.post("/api/v1/client/uploads/{upload_id}/finalize", response_model=schemas.UpdateResponse)
+def finalize_upload(upload_id: str, db: Session = Depends(get_db)):
+    upload = get_upload_session(db, upload_id)
+    if upload.status != "open":
+        # Idempotent: a client retrying after a lost response learns the update it already created
+        update = db.query(models.ModelUpdate).filter(models.ModelUpdate.id == upload_id).first()
+        if update is None:
+            raise HTTPException(status_code=409, detail="Upload is being finalized; retry shortly")
+        return schemas.UpdateResponse(
+            status="rejected" if update.status == "rejected" else "queued",
+            queued_update_id=update.id,
+            l2_norm=update.l2_norm if update.l2_norm is not None else 1.0
+        )
+    if upload.committed_offset != upload.total_size:
+        raise HTTPException(status_code=409, detail=f"Upload incomplete: {upload.committed_offset}/{upload.total_size} bytes")
+
+    # Conditional update so of two racing finalizes only one moves the file and creates the update
+    claimed = db.query(models.UploadSession).filter(
+        models.UploadSession.id == upload_id,
+        models.UploadSession.status == "open"
+    ).update({models.UploadSession.status: "finalizing"}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        return finalize_upload(upload_id, db)
+
+    path = chunked_upload.partial_path(UPLOADS_PATH, upload_id)
+    if upload.sha256 and chunked_upload.file_sha256(path) != upload.sha256:
+        upload.status = "open"
+        db.commit()
+        raise HTTPException(status_code=422, detail="File checksum mismatch")
+
+    # The upload ID becomes the update ID so the session maps 1:1 onto its ModelUpdate
+    save_path = storage_lifecycle.lifecycle.move_into_updates(upload_id, path)
+
+    response = queue_update(db, upload_id, upload.client_id, upload.experiment_id, upload.parent_model_version, save_path)
+    upload.status = "finalized"
+    db.commit()
+    return response
+
 @app.post("/api/notebooks/{notebook_id}/restart")
 def restart_kernel(notebook_id: str):
     return runtime_manager.manager.restart_session(notebook_id)
@@ -0,0 +1,162 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+import models
+from update_validator import InvalidUpdateError, read_safetensors_header
+
+# How many published versions per experiment stay on disk
+KEEP_LAST_VERSIONS = 5
+
+# How many versions (across experiments) stay memory-mapped for serving
+HOT_VERSIONS = 4
+
+SERVE_CHUNK_SIZE = 1024 * 1024
+
+class HotModel:
+    def __init__(self, path: str, sha256: str):
+        with open(path, "rb") as f:
+            # mmap keeps its own reference to the file, so later unlinks by retention are harmless
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.sha256 = sha256
+        self.size = len(self.data)
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        for start in range(0, self.size, SERVE_CHUNK_SIZE):
+            yield self.data[start:start + SERVE_CHUNK_SIZE]
+
+class ModelStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self._hot: "OrderedDict[tuple, HotModel]" = OrderedDict()
+        self._hot_lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+
+    def version_path(self, experiment_id: str, version: int) -> str:
+        return os.path.join(self.root, experiment_id, f"v{version:06d}.safetensors")
+
+    def get_version(self, db: Session, experiment_id: str, version: int) -> Optional[models.ModelVersion]:
+        return db.query(models.ModelVersion).filter(
+            models.ModelVersion.experiment_id == experiment_id,
+            models.ModelVersion.version == version
+        ).first()
+
+    def publish(self, db: Session, experiment_id: str, source_path: str, move: bool = False) -> models.ModelVersion:
+        """Adds `source_path` to the store as the experiment's next version and makes it current.
+        The file is fully written and hashed under a temporary name before an atomic rename,
+        so readers only ever see complete versions. With `move`, a file already on the
+        store's filesystem (e.g. a fresh aggregate) is renamed in instead of copied."""
+        with self._publish_lock:
+            exp = db.query(models.Experiment).filter(models.Experiment.id == experiment_id).first()
+            if not exp:
+                raise ValueError(f"Experiment {experiment_id} not found")
+
+            latest = db.query(models.ModelVersion).filter(
+                models.ModelVersion.experiment_id == experiment_id
+            ).order_by(models.ModelVersion.version.desc()).first()
+            # The first published file takes the version clients have already been told about
+            version = latest.version + 1 if latest else exp.current_model_version
+
+            final_path = self.version_path(experiment_id, version)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            digest = hashlib.sha256()
+            size = 0
+            if move:
+                with open(source_path, "rb") as src:
+                    while block := src.read(SERVE_CHUNK_SIZE):
+                        digest.update(block)
+                        size += len(block)
+                    os.fsync(src.fileno())
+                os.replace(source_path, final_path)
+            else:
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(final_path), suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as out, open(source_path, "rb") as src:
+                        while block := src.read(SERVE_CHUNK_SIZE):
+                            digest.update(block)
+                            out.write(block)
+                            size += len(block)
+                        out.flush()
+                        os.fsync(out.fileno())
+                    os.replace(tmp_path, final_path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+
+            record = models.ModelVersion(
+                experiment_id=experiment_id,
+                version=version,
+                sha256=digest.hexdigest(),
+                size=size,
+                path=final_path
+            )
+            db.add(record)
+            exp.current_model_version = version
+            db.commit()
+            db.refresh(record)
+
+            self._apply_retention(db, experiment_id)
+            return record
+
+    def _apply_retention(self, db: Session, experiment_id: str):
+        stale = db.query(models.ModelVersion).filter(
+            models.ModelVersion.experiment_id == experiment_id
+        ).order_by(models.ModelVersion.version.desc()).offset(KEEP_LAST_VERSIONS).all()
+        for record in stale:
+            # Unlinking is safe for in-flight downloads: they hold an open mmap of the file
+            if os.path.exists(record.path):
+                os.remove(record.path)
+            with self._hot_lock:
+                self._hot.pop((experiment_id, record.version), None)
+            db.delete(record)
+        if stale:
+            db.commit()
+
+    def open_version(self, record: models.ModelVersion) -> HotModel:
+        key = (record.experiment_id, record.version)
+        with self._hot_lock:
+            hot = self._hot.get(key)
+            if hot is not None:
+                self._hot.move_to_end(key)
+                return hot
+
+        hot = HotModel(record.path, record.sha256)
+        with self._hot_lock:
+            # Another request may have mapped it meanwhile; keep a single mapping
+            existing = self._hot.get(key)
+            if existing is not None:
+                return existing
+            self._hot[key] = hot
+            while len(self._hot) > HOT_VERSIONS:
+                # Evicted maps are not closed explicitly; responses still streaming
+                # from them keep them alive until they finish
+                self._hot.popitem(last=False)
+        return hot
+
+    def import_legacy(self, db: Session, legacy_path: str):
+        """Seeds experiments that have no published versions with the old single-file model."""
+        if not os.path.exists(legacy_path) or os.path.getsize(legacy_path) == 0:
+            return
+        try:
+            read_safetensors_header(legacy_path)
+        except InvalidUpdateError as e:
+            # Placeholder files would become v1 and switch off layout checks for every update against it
+            print(f"Warning: not importing legacy model {legacy_path}: {e}")
+            return
+        for exp in db.query(models.Experiment).all():
+            has_version = db.query(models.ModelVersion).filter(
+                models.ModelVersion.experiment_id == exp.id
+            ).first()
+            if not has_version:
+                self.publish(db, exp.id, legacy_path)
+
+# Global instance
+store = ModelStore(os.path.abspath(os.path.join(os.path.dirname(__file__), "storage", "models")))
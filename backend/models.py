@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, JSON, Integer, ForeignKey, Boolean, Float
+from sqlalchemy import Column, String, DateTime, JSON, Integer, ForeignKey, Boolean, Float, UniqueConstraint
 from database import Base
 import datetime
 import uuid
@@ -40,5 +40,36 @@ class ModelUpdate(Base):
     experiment_id = Column(String, ForeignKey("experiments.id"))
     parent_model_version = Column(Integer)
     l2_norm = Column(Float)
-    status = Column(String, default="queued") # queued, aggregated, rejected
+    status = Column(String, default="queued") # queued, validated, aggregated, rejected
+    rejection_reason = Column(String, nullable=True)
+    aggregated_into_version = Column(Integer, nullable=True) # Global model version this update contributed to
+    aggregated_at = Column(DateTime, nullable=True) # Retention of aggregated updates runs from here, not from upload
+    archive_path = Column(String, nullable=True) # Set once compaction moved the file into a round archive
+    archive_member = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    client_id = Column(String, ForeignKey("clients.id"))
+    experiment_id = Column(String, ForeignKey("experiments.id"))
+    parent_model_version = Column(Integer)
+    total_size = Column(Integer)
+    committed_offset = Column(Integer, default=0)
+    sha256 = Column(String, nullable=True) # Optional checksum of the whole file, verified on finalize
+    status = Column(String, default="open") # open, finalizing, finalized
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class ModelVersion(Base):
+    __tablename__ = "model_versions"
+    __table_args__ = (UniqueConstraint("experiment_id", "version"),)
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    experiment_id = Column(String, ForeignKey("experiments.id"), index=True)
+    version = Column(Integer)
+    sha256 = Column(String)
+    size = Column(Integer)
+    path = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -0,0 +1,268 @@
+import ast
+import builtins
+import hashlib
+from typing import Dict, List, Optional, Set
+
+BUILTIN_NAMES = set(dir(builtins))
+
+# Calls whose result differs between runs; cells using them are never served from cache
+NONDETERMINISTIC_CALLS = {
+    "random", "randint", "randn", "rand", "shuffle", "choice", "sample", "uniform", "normal",
+    "time", "time_ns", "perf_counter", "now", "utcnow", "today",
+    "uuid1", "uuid4", "urandom", "token_hex", "token_bytes", "input",
+}
+NONDETERMINISTIC_MODULES = {"random", "secrets", "uuid"}
+
+# Method calls that only read their receiver; any other `name.method(...)` may mutate `name` in place
+NONMUTATING_METHODS = {
+    "copy", "get", "keys", "values", "items", "count", "index", "startswith", "endswith",
+    "format", "join", "split", "strip", "lower", "upper", "head", "tail", "describe", "info",
+    "sum", "mean", "min", "max", "std", "shape", "tolist", "numpy", "item", "cpu", "detach",
+    "eval", "state_dict", "parameters", "named_parameters", "to_dict", "to_numpy", "predict",
+}
+
+class CellSymbols:
+    def __init__(self, defines: Set[str], uses: Set[str], deterministic: bool, parsed: bool,
+                 mutates: Optional[Set[str]] = None, imports: Optional[Set[str]] = None):
+        self.defines = defines
+        self.uses = uses
+        self.deterministic = deterministic
+        self.parsed = parsed
+        # Receivers of method calls that may change them in place, and names bound to modules
+        self.mutates = mutates or set()
+        self.imports = imports or set()
+
+    @property
+    def written(self) -> Set[str]:
+        return self.defines | self.mutates
+
+    @property
+    def rewritten(self) -> Set[str]:
+        """Names whose new value depends on their previous one (`x.append(..)`, `x += 1`,
+        `x = f(x)`); running the cell twice on the same state does not give the same result."""
+        return self.uses & self.written
+
+def _target_names(node: ast.AST) -> Set[str]:
+    # `x.attr = ...` and `x[i] = ...` mutate x, so they count as (re)defining it
+    if isinstance(node, ast.Name):
+        return {node.id}
+    if isinstance(node, (ast.Tuple, ast.List)):
+        names = set()
+        for element in node.elts:
+            names |= _target_names(element)
+        return names
+    if isinstance(node, ast.Starred):
+        return _target_names(node.value)
+    if isinstance(node, (ast.Attribute, ast.Subscript)):
+        base = node.value
+        while isinstance(base, (ast.Attribute, ast.Subscript)):
+            base = base.value
+        return {base.id} if isinstance(base, ast.Name) else set()
+    return set()
+
+def _loaded_names(node: ast.AST) -> Set[str]:
+    """Free names read anywhere under `node`, excluding names bound inside nested scopes."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        args = node.args
+        params = {a.arg for a in args.posonlyargs + args.args + args.kwonlyargs}
+        params |= {a.arg for a in (args.vararg, args.kwarg) if a}
+        defaults = set()
+        for default in args.defaults + [d for d in args.kw_defaults if d is not None]:
+            defaults |= _loaded_names(default)
+        body = node.body if isinstance(node.body, list) else [node.body]
+        local = params | {n.id for stmt in body for n in ast.walk(stmt) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+        loads = set()
+        for stmt in body:
+            loads |= _loaded_names(stmt)
+        decorators = set()
+        for decorator in getattr(node, "decorator_list", []):
+            decorators |= _loaded_names(decorator)
+        return (loads - local) | defaults | decorators
+    if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+        bound = set()
+        loads = set()
+        for generator in node.generators:
+            loads |= _loaded_names(generator.iter) - bound
+            bound |= _target_names(generator.target)
+            for condition in generator.ifs:
+                loads |= _loaded_names(condition) - bound
+        elements = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+        for element in elements:
+            loads |= _loaded_names(element) - bound
+        return loads
+    if isinstance(node, ast.Name):
+        return {node.id} if isinstance(node.ctx, ast.Load) else set()
+
+    loads = set()
+    for child in ast.iter_child_nodes(node):
+        loads |= _loaded_names(child)
+    # Mutating x.attr or x[i], or `x += ...`, reads x first
+    if isinstance(node, (ast.Attribute, ast.Subscript)) and isinstance(node.ctx, ast.Store):
+        loads |= _target_names(node)
+    if isinstance(node, ast.AugAssign):
+        loads |= _target_names(node.target)
+    return loads
+
+def _is_deterministic(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            func = node.func
+            name = func.attr if isinstance(func, ast.Attribute) else func.id if isinstance(func, ast.Name) else None
+            if name in NONDETERMINISTIC_CALLS:
+                return False
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            modules = [node.module] if isinstance(node, ast.ImportFrom) else [a.name for a in node.names]
+            if any(m and m.split(".")[0] in NONDETERMINISTIC_MODULES for m in modules):
+                return False
+    return True
+
+def _mutated_names(node: ast.AST) -> Set[str]:
+    """Receivers of method calls executed by a top-level statement. Function bodies and
+    lambdas only run when called, so calls inside them are not counted."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        return set()
+    names = set()
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr not in NONMUTATING_METHODS:
+        names |= _target_names(node.func)
+    for child in ast.iter_child_nodes(node):
+        names |= _mutated_names(child)
+    return names
+
+def _bound_names(node: ast.AST) -> Set[str]:
+    """Names a top-level statement binds in the notebook namespace. Bindings inside
+    function bodies, lambdas and comprehensions stay in their own scope."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        names = {node.name}
+        for child in ast.walk(node):
+            if isinstance(child, ast.Global):
+                names |= set(child.names)
+        return names
+    if isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+        return set()
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return {alias.asname or alias.name.split(".")[0] for alias in node.names if alias.name != "*"}
+    if isinstance(node, ast.Name):
+        return {node.id} if isinstance(node.ctx, (ast.Store, ast.Del)) else set()
+
+    names = set()
+    if isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+        for target in node.targets if isinstance(node, ast.Assign) else [node.target]:
+            names |= _target_names(target)
+    for child in ast.iter_child_nodes(node):
+        names |= _bound_names(child)
+    return names
+
+def analyze_cell(source: str) -> CellSymbols:
+    if source.strip().startswith("!"):
+        # Shell commands (pip installs) bind no names; rerun them only when their text changes
+        return CellSymbols(set(), set(), True, True)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return CellSymbols(set(), set(), False, False)
+
+    defines: Set[str] = set()
+    uses: Set[str] = set()
+    mutates: Set[str] = set()
+    imports: Set[str] = set()
+    # Walk top-level statements in order so a name defined earlier in the cell is not an upstream input
+    for stmt in tree.body:
+        uses |= _loaded_names(stmt) - defines
+        mutates |= _mutated_names(stmt)
+        if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+            imports |= _bound_names(stmt)
+        else:
+            imports -= _bound_names(stmt)
+        defines |= _bound_names(stmt)
+
+    return CellSymbols(defines, uses - BUILTIN_NAMES, _is_deterministic(tree), True, mutates - BUILTIN_NAMES, imports)
+
+def names_written(source: str) -> Set[str]:
+    """Names `source` binds or may mutate; code that only reads a name leaves cells using it valid.
+    Unparseable code never runs, so it writes nothing."""
+    return analyze_cell(source).written
+
+class CellPlan:
+    def __init__(self, cell_id: str, symbols: CellSymbols, depends_on: List[str], fingerprint: str, stale: bool, reason: Optional[str]):
+        self.cell_id = cell_id
+        self.symbols = symbols
+        self.depends_on = depends_on
+        self.fingerprint = fingerprint
+        self.stale = stale
+        self.reason = reason
+
+def build_plan(cells: List[Dict], executed: Dict[str, str]) -> List[CellPlan]:
+    """Builds the dependency DAG of a notebook's code cells in notebook order and marks
+    which cells need to run. `executed` maps cell ids to the fingerprint they last ran
+    with in the current kernel.
+
+    A cell depends on the latest earlier cell that defined or used each name it uses, since a
+    use may mutate the object in place (`data.append(x)`, `model.fit(...)`). Its fingerprint
+    hashes its code with its upstream fingerprints, so any upstream edit changes it. A cell
+    is stale if it never ran with that fingerprint, cannot be analyzed or cached, or has a
+    stale upstream.
+
+    Re-running a cell that rewrites a name (see CellSymbols.rewritten) on kernel state that
+    already includes its own or later cells' effects would apply them twice, so the cell
+    that last touched the name before it is rewound (marked stale) too, until a cell that
+    rebinds the name from scratch is reached."""
+    analyzed = [
+        (cell["id"], cell.get("content") or "", analyze_cell(cell.get("content") or ""))
+        for cell in cells if cell.get("type") == "code"
+    ]
+    # Names the kernel's state reflects from each position on, per the executed cells
+    touched_from: List[Set[str]] = [set() for _ in range(len(analyzed) + 1)]
+    for index in range(len(analyzed) - 1, -1, -1):
+        cell_id, _, symbols = analyzed[index]
+        touched_from[index] = touched_from[index + 1] | (
+            symbols.defines | symbols.uses | symbols.mutates if cell_id in executed else set()
+        )
+
+    rewound: Set[str] = set()
+    while True:
+        plans, rewinds = _plan_pass(analyzed, executed, rewound, touched_from)
+        if rewinds <= rewound:
+            return plans
+        rewound |= rewinds
+
+def _plan_pass(analyzed, executed: Dict[str, str], rewound: Set[str], touched_from: List[Set[str]]):
+    plans: List[CellPlan] = []
+    by_id: Dict[str, CellPlan] = {}
+    last_toucher: Dict[str, str] = {}
+    module_names: Set[str] = set()
+    rewinds: Set[str] = set()
+
+    for index, (cell_id, source, symbols) in enumerate(analyzed):
+        depends_on = sorted({last_toucher[name] for name in symbols.uses if name in last_toucher})
+        digest = hashlib.sha256(source.encode("utf-8"))
+        for upstream in depends_on:
+            digest.update(by_id[upstream].fingerprint.encode())
+        fingerprint = digest.hexdigest()
+
+        if not symbols.parsed:
+            stale, reason = True, "opaque"
+        elif not symbols.deterministic:
+            stale, reason = True, "nondeterministic"
+        elif executed.get(cell_id) != fingerprint:
+            stale, reason = True, "changed" if cell_id in executed else "not_run"
+        elif any(by_id[upstream].stale for upstream in depends_on):
+            stale, reason = True, "upstream"
+        elif cell_id in rewound:
+            stale, reason = True, "rewound"
+        else:
+            stale, reason = False, None
+
+        if stale:
+            # Calls on modules (np.random.seed) do not make the import cell re-run
+            for name in symbols.rewritten - module_names:
+                if name in touched_from[index] and name in last_toucher:
+                    rewinds.add(last_toucher[name])
+
+        plan = CellPlan(cell_id, symbols, depends_on, fingerprint, stale, reason)
+        plans.append(plan)
+        by_id[cell_id] = plan
+        for name in symbols.defines | symbols.uses:
+            last_toucher[name] = cell_id
+        module_names = (module_names - symbols.defines) | symbols.imports
+
+    return plans, rewinds
@@ -4,7 +4,29 @@ import json
 import time
 import sys
 import threading
-from typing import Dict, Optional
+import queue
+from typing import Dict, Iterator, List, Optional, Set
+
+import metrics
+
+KERNEL_SPAWN_SECONDS = metrics.Histogram(
+    "kernel_spawn_duration_seconds", "Time from starting a kernel process to KERNEL_READY"
+)
+EXECUTE_SECONDS = metrics.Histogram(
+    "kernel_execute_duration_seconds", "Duration of RuntimeSession.execute, including lock wait", ["kind"]
+)
+BATCH_CELLS = metrics.Counter(
+    "kernel_batch_cells_total", "Cells executed through batch runs, by outcome", ["status"]
+)
+EXECUTE_TIMEOUTS = metrics.Counter(
+    "kernel_execute_timeouts_total", "Executions that hit the time limit"
+)
+KERNEL_RESTARTS = metrics.Counter(
+    "kernel_restarts_total", "Kernel (re)starts other than the first, by cause", ["reason"]
+)
+KERNEL_IDLE_SHUTDOWNS = metrics.Counter(
+    "kernel_idle_shutdowns_total", "Kernels terminated after 30 minutes of inactivity"
+)
 
 class RuntimeSession:
     def __init__(self, notebook_id: str, workspace_root: str):
@@ -19,9 +41,19 @@ class RuntimeSession:
         self.process: Optional[subprocess.Popen] = None
         self.last_used = time.time()
         self.lock = threading.Lock()
+        # Incremental re-execution state: cell id -> fingerprint it last ran with in this kernel,
+        # the names it touched, and outputs memoized by fingerprint
+        self.executed_cells: Dict[str, str] = {}
+        self.cell_names: Dict[str, Set[str]] = {}
+        self.cell_outputs: Dict[str, dict] = {}
         self.start_kernel()
 
     def start_kernel(self):
+        started = time.perf_counter()
+        # A fresh kernel has none of the previous cells' state
+        self.executed_cells = {}
+        self.cell_names = {}
+        self.cell_outputs = {}
         # We run the wrapper script using the same executable
         kernel_script = os.path.join(os.path.dirname(__file__), "kernel_wrapper.py")
         env = os.environ.copy()
@@ -39,19 +71,33 @@ class RuntimeSession:
         line = self.process.stdout.readline()
         if "KERNEL_READY" not in line:
              print(f"Warning: Kernel for {self.notebook_id} might not have started correctly: {line}")
+        KERNEL_SPAWN_SECONDS.observe(time.perf_counter() - started)
 
-    def execute(self, code: str, timeout: int = 30):
+    def execute(self, code: str, timeout: int = 30, profile_top_n: Optional[int] = None):
+        started = time.perf_counter()
+        kind = "shell" if code.strip().startswith('!') else "code"
+        try:
+            return self._execute(code, timeout, profile_top_n)
+        finally:
+            EXECUTE_SECONDS.observe(time.perf_counter() - started, kind=kind)
+
+    def _execute(self, code: str, timeout: int = 30, profile_top_n: Optional[int] = None):
         with self.lock:
             self.last_used = time.time()
             if not self.process or self.process.poll() is not None:
+                KERNEL_RESTARTS.inc(reason="crash")
                 self.start_kernel()
             
             # Send code as JSON to kernel
-            task = json.dumps({"code": code})
+            message = {"code": code}
+            if profile_top_n is not None:
+                message["profile"] = {"top_n": profile_top_n}
+            task = json.dumps(message)
             try:
                 self.process.stdin.write(task + "\n")
                 self.process.stdin.flush()
             except Exception as e:
+                KERNEL_RESTARTS.inc(reason="broken_pipe")
                 self.start_kernel()
                 self.process.stdin.write(task + "\n")
                 self.process.stdin.flush()
@@ -80,6 +126,8 @@ class RuntimeSession:
                 # If it's a shell command and still running, we keep waiting (async-like behavior)
                 # For standard code, we terminate after 30s
                 if not is_shell_cmd:
+                    EXECUTE_TIMEOUTS.inc()
+                    KERNEL_RESTARTS.inc(reason="timeout")
                     self.terminate()
                     self.start_kernel()
                     return {"stdout": "", "stderr": f"Execution exceeded {timeout}s limit. Kernel restarted.", "error": "TimeoutError", "plots": []}
@@ -89,6 +137,110 @@ class RuntimeSession:
             
             return result_container.get('data', {"stdout": "", "stderr": "Unexpected kernel exit", "error": "KernelError", "plots": []})
 
+    def execute_batch(self, cells: List[dict], stop_on_error: bool = True, timeout: int = 30) -> Iterator[dict]:
+        """Sends `cells` ({"id", "code"}) to the kernel in one message and yields each cell's
+        result, tagged with its cell_id, as the kernel finishes it. `timeout` applies per cell
+        (shell cells have none); a timeout restarts the kernel and ends the batch.
+
+        The session lock is held until the batch is over. If the consumer stops early, the
+        rest of the batch still runs to keep the kernel's output in step with its input."""
+        started = time.perf_counter()
+        with self.lock:
+            self.last_used = time.time()
+            if not self.process or self.process.poll() is not None:
+                KERNEL_RESTARTS.inc(reason="crash")
+                self.start_kernel()
+
+            task = json.dumps({"batch": cells, "stop_on_error": stop_on_error})
+            try:
+                self.process.stdin.write(task + "\n")
+                self.process.stdin.flush()
+            except Exception:
+                KERNEL_RESTARTS.inc(reason="broken_pipe")
+                self.start_kernel()
+                self.process.stdin.write(task + "\n")
+                self.process.stdin.flush()
+
+            # One reader for the whole batch instead of a thread per cell
+            lines: queue.Queue = queue.Queue()
+            process = self.process
+            def read_responses():
+                while True:
+                    line = process.stdout.readline()
+                    lines.put(line)
+                    if not line or '"batch_done"' in line:
+                        break
+            threading.Thread(target=read_responses, daemon=True).start()
+
+            done = False
+            try:
+                for cell in cells:
+                    is_shell_cmd = cell.get("code", "").strip().startswith('!')
+                    try:
+                        line = lines.get(timeout=None if is_shell_cmd else timeout)
+                    except queue.Empty:
+                        EXECUTE_TIMEOUTS.inc()
+                        KERNEL_RESTARTS.inc(reason="timeout")
+                        BATCH_CELLS.inc(status="timeout")
+                        self.terminate()
+                        self.start_kernel()
+                        done = True
+                        yield {"cell_id": cell.get("id"), "stdout": "", "stderr": f"Execution exceeded {timeout}s limit. Kernel restarted.", "error": "TimeoutError", "plots": []}
+                        return
+
+                    result = json.loads(line) if line else None
+                    if result is None or result.get("batch_done"):
+                        # Kernel died, or stopped early after an error
+                        done = True
+                        if result is None:
+                            BATCH_CELLS.inc(status="error")
+                            yield {"cell_id": cell.get("id"), "stdout": "", "stderr": "Unexpected kernel exit", "error": "KernelError", "plots": []}
+                        return
+
+                    BATCH_CELLS.inc(status="error" if result.get("error") else "ok")
+                    yield result
+            finally:
+                if not done:
+                    # Consume the closing line; if the consumer went away mid-batch, this waits for
+                    # the kernel to finish so the next request does not read leftover lines
+                    try:
+                        while '"batch_done"' not in (lines.get(timeout=timeout) or '"batch_done"'):
+                            pass
+                    except queue.Empty:
+                        KERNEL_RESTARTS.inc(reason="timeout")
+                        self.terminate()
+                        self.start_kernel()
+                EXECUTE_SECONDS.observe(time.perf_counter() - started, kind="batch")
+
+    def record_cell(self, cell_id: str, fingerprint: str, names: Set[str], result: dict):
+        previous = self.executed_cells.get(cell_id)
+        if previous is not None:
+            self.cell_outputs.pop(previous, None)
+        self.executed_cells[cell_id] = fingerprint
+        self.cell_names[cell_id] = names
+        self.cell_outputs[fingerprint] = result
+
+    def forget_cell(self, cell_id: str):
+        fingerprint = self.executed_cells.pop(cell_id, None)
+        self.cell_names.pop(cell_id, None)
+        if fingerprint is not None:
+            self.cell_outputs.pop(fingerprint, None)
+
+    def forget_cells_touching(self, names: Set[str]):
+        # Ad-hoc code may have rebound or mutated names that recorded cells rely on
+        for cell_id in [c for c, touched in self.cell_names.items() if touched & names]:
+            self.forget_cell(cell_id)
+
+    def rss_bytes(self) -> int:
+        if not self.process or self.process.poll() is not None:
+            return 0
+        try:
+            # Linux only; elsewhere kernels simply report 0
+            with open(f"/proc/{self.process.pid}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            return 0
+
     def terminate(self):
         if self.process:
             self.process.terminate()
@@ -114,10 +266,14 @@ class RuntimeManager:
 
     def restart_session(self, notebook_id: str):
         if notebook_id in self.sessions:
+            KERNEL_RESTARTS.inc(reason="manual")
             self.sessions[notebook_id].terminate()
             self.sessions[notebook_id] = RuntimeSession(notebook_id, self.workspace_root)
         return {"message": "Kernel restarted successfully"}
 
+    def kernel_rss(self) -> Dict[tuple, float]:
+        return {(nb_id,): session.rss_bytes() for nb_id, session in list(self.sessions.items())}
+
     def _cleanup_loop(self):
         while True:
             time.sleep(60)
@@ -130,8 +286,12 @@ class RuntimeManager:
             
             for nb_id in to_delete:
                 print(f"Cleaning up inactive session for {nb_id}")
+                KERNEL_IDLE_SHUTDOWNS.inc()
                 self.sessions[nb_id].terminate()
                 del self.sessions[nb_id]
 
 # Global instance
 manager = RuntimeManager()
+
+metrics.Gauge("kernels_live", "Kernel sessions currently held by the RuntimeManager", fn=lambda: len(manager.sessions))
+metrics.Gauge("kernel_rss_bytes", "Resident memory of each live kernel process", ["notebook_id"], fn=manager.kernel_rss)
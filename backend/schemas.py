@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Any
 from datetime import datetime
 
@@ -29,12 +29,72 @@ class Notebook(NotebookBase):
 class ExecutionRequest(BaseModel):
     notebook_id: str
     code: str
+    profile: bool = False
+    profile_top_n: int = Field(15, ge=1, le=100)
+
+class ProfileHotspot(BaseModel):
+    function: str
+    file: str
+    line: int
+    calls: int
+    self_time: float
+    cumulative_time: float
+
+class ProfileAllocation(BaseModel):
+    file: str
+    line: int
+    size_bytes: int
+    count: int
+
+class CellProfile(BaseModel):
+    wall_time: float
+    cpu_time: float
+    peak_memory_bytes: int
+    hotspots: List[ProfileHotspot] = []
+    allocations: List[ProfileAllocation] = []
 
 class ExecutionResponse(BaseModel):
     stdout: str
     stderr: Optional[str] = None
     error: Optional[str] = None
     plots: List[str] = []
+    profile: Optional[CellProfile] = None
+
+class CellDependency(BaseModel):
+    cell_id: str
+    defines: List[str]
+    uses: List[str]
+    depends_on: List[str]
+    deterministic: bool
+    stale: bool
+    reason: Optional[str] = None
+
+class NotebookDependencies(BaseModel):
+    notebook_id: str
+    cells: List[CellDependency]
+
+class CellRunResult(BaseModel):
+    cell_id: str
+    status: str # executed, cached, error, skipped
+    result: Optional[ExecutionResponse] = None
+
+class RunStaleResponse(BaseModel):
+    notebook_id: str
+    results: List[CellRunResult]
+
+class BatchRunRequest(BaseModel):
+    # Defaults to the notebook's saved cells
+    cells: Optional[List[Cell]] = None
+    stop_on_error: bool = True
+    save_outputs: bool = False
+
+class BatchRunSummary(BaseModel):
+    notebook_id: str
+    executed: int
+    errors: int
+    skipped: int
+    saved: bool
+    duration_seconds: float
 
 # --- Federated Learning Schemas ---
 
@@ -53,3 +113,36 @@ class UpdateResponse(BaseModel):
     status: str
     queued_update_id: str
     l2_norm: float
+
+class UpdateStatusResponse(BaseModel):
+    update_id: str
+    status: str
+    l2_norm: Optional[float] = None
+    rejection_reason: Optional[str] = None
+
+class UploadSessionCreate(BaseModel):
+    experiment_id: str
+    client_id: str
+    parent_model_version: int
+    total_size: int
+    sha256: Optional[str] = None
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    status: str
+    total_size: int
+    committed_offset: int
+    chunk_size: int
+
+class ModelVersionResponse(BaseModel):
+    experiment_id: str
+    version: int
+    sha256: str
+    size: int
+
+class AggregationResponse(BaseModel):
+    experiment_id: str
+    version: int
+    sha256: str
+    num_updates: int
+    duration_seconds: float
@@ -0,0 +1,196 @@
+import datetime
+import os
+import threading
+import time
+import zipfile
+from typing import IO, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import chunked_upload, database, models
+
+# Rejected updates are kept briefly so clients can still query why they failed
+REJECTED_RETENTION = datetime.timedelta(days=1)
+
+# Aggregated updates (live or archived) are only needed for audits of recent rounds
+AGGREGATED_RETENTION = datetime.timedelta(days=30)
+
+# Resumable upload sessions, finished or abandoned
+STALE_UPLOAD_RETENTION = datetime.timedelta(days=1)
+
+GC_INTERVAL_SECONDS = 3600
+
+# Deflate round archives; trades CPU at compaction time for disk. Updates are mostly
+# high-entropy floats, so this is off unless FEDAURA_COMPRESS_ARCHIVES=1
+COMPRESS_ARCHIVES = os.environ.get("FEDAURA_COMPRESS_ARCHIVES", "").lower() in ("1", "true", "yes")
+
+class StorageLifecycle:
+    def __init__(self, storage_root: str, compress_archives: bool = False):
+        self.storage_root = storage_root
+        self.updates_root = os.path.join(storage_root, "updates")
+        self.archives_root = os.path.join(storage_root, "archives")
+        self.uploads_root = os.path.join(storage_root, "uploads")
+        self.compress_archives = compress_archives
+        self.gc_thread: Optional[threading.Thread] = None
+        # Creating a file in a shard directory and removing that directory once empty must not interleave
+        self._shard_lock = threading.Lock()
+
+    def update_path(self, update_id: str) -> str:
+        # Two levels of 256-way fan-out keep every directory small even with millions of updates
+        return os.path.join(self.updates_root, update_id[:2], update_id[2:4], f"{update_id}.safetensors")
+
+    def create_update_file(self, update_id: str) -> IO[bytes]:
+        path = self.update_path(update_id)
+        with self._shard_lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return open(path, "wb")
+
+    def move_into_updates(self, update_id: str, source_path: str) -> str:
+        path = self.update_path(update_id)
+        with self._shard_lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(source_path, path)
+        return path
+
+    def locate_update(self, update_id: str) -> str:
+        path = self.update_path(update_id)
+        if not os.path.exists(path):
+            # Updates written before sharding live directly in updates/
+            legacy_path = os.path.join(self.updates_root, f"{update_id}.safetensors")
+            if os.path.exists(legacy_path):
+                return legacy_path
+        return path
+
+    def compact_round(self, db: Session, experiment_id: str, version: int) -> Optional[str]:
+        """Packs the live update files that went into `version` into one archive and
+        repoints their rows at it. Returns the archive path, or None if nothing was left to pack."""
+        updates = db.query(models.ModelUpdate).filter(
+            models.ModelUpdate.experiment_id == experiment_id,
+            models.ModelUpdate.status == "aggregated",
+            models.ModelUpdate.aggregated_into_version == version,
+            models.ModelUpdate.archive_path.is_(None)
+        ).all()
+        updates = [update for update in updates if os.path.exists(self.locate_update(update.id))]
+        if not updates:
+            return None
+
+        archive_dir = os.path.join(self.archives_root, experiment_id)
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_path = os.path.join(archive_dir, f"round-v{version:06d}.zip")
+        tmp_path = archive_path + ".tmp"
+
+        # Zip rather than tar so a single update can be read back without scanning the archive
+        compression = zipfile.ZIP_DEFLATED if self.compress_archives else zipfile.ZIP_STORED
+        try:
+            with zipfile.ZipFile(tmp_path, "w", compression=compression, allowZip64=True) as archive:
+                for update in updates:
+                    archive.write(self.locate_update(update.id), arcname=f"{update.id}.safetensors")
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, archive_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        live_paths = [self.locate_update(update.id) for update in updates]
+        for update in updates:
+            update.archive_path = archive_path
+            update.archive_member = f"{update.id}.safetensors"
+        db.commit()
+
+        # Only drop the originals once the rows point at the archive
+        for path in live_paths:
+            self._remove_update(path)
+        return archive_path
+
+    def collect_garbage(self, db: Session, now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+        now = now or datetime.datetime.utcnow()
+        stats = {"rejected": 0, "aggregated": 0, "archives": 0, "uploads": 0}
+
+        rejected = db.query(models.ModelUpdate).filter(
+            models.ModelUpdate.status == "rejected",
+            models.ModelUpdate.timestamp < now - REJECTED_RETENTION
+        ).all()
+        for update in rejected:
+            self._remove_update(self.locate_update(update.id))
+            db.delete(update)
+            stats["rejected"] += 1
+
+        # Rows aggregated before aggregated_at existed fall back to their upload time
+        aggregated = db.query(models.ModelUpdate).filter(
+            models.ModelUpdate.status == "aggregated",
+            func.coalesce(models.ModelUpdate.aggregated_at, models.ModelUpdate.timestamp) < now - AGGREGATED_RETENTION
+        ).all()
+        archives = set()
+        for update in aggregated:
+            if update.archive_path:
+                archives.add(update.archive_path)
+            else:
+                self._remove_update(self.locate_update(update.id))
+            db.delete(update)
+            stats["aggregated"] += 1
+        db.commit()
+
+        # An archive goes once none of its rows survive retention
+        for archive_path in archives:
+            still_referenced = db.query(models.ModelUpdate).filter(
+                models.ModelUpdate.archive_path == archive_path
+            ).first()
+            if not still_referenced:
+                self._remove(archive_path)
+                stats["archives"] += 1
+
+        stale_uploads = db.query(models.UploadSession).filter(
+            models.UploadSession.updated_at < now - STALE_UPLOAD_RETENTION
+        ).all()
+        for upload in stale_uploads:
+            self._remove(chunked_upload.partial_path(self.uploads_root, upload.id))
+            db.delete(upload)
+            stats["uploads"] += 1
+        db.commit()
+
+        return stats
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _remove_update(self, path: str):
+        # Prune the emptied updates/xx/yy/ shard directories, or their number only ever grows
+        with self._shard_lock:
+            self._remove(path)
+            directory = os.path.dirname(path)
+            while os.path.abspath(directory).startswith(os.path.abspath(self.updates_root) + os.sep):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    def start(self):
+        if self.gc_thread is None:
+            self.gc_thread = threading.Thread(target=self._gc_loop, daemon=True)
+            self.gc_thread.start()
+
+    def _gc_loop(self):
+        while True:
+            time.sleep(GC_INTERVAL_SECONDS)
+            db = database.SessionLocal()
+            try:
+                stats = self.collect_garbage(db)
+                if any(stats.values()):
+                    print(f"Storage GC removed {stats}")
+            except Exception as e:
+                print(f"Storage GC failed: {e}")
+            finally:
+                db.close()
+
+# Global instance
+lifecycle = StorageLifecycle(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "storage")),
+    compress_archives=COMPRESS_ARCHIVES
+)
@@ -0,0 +1,212 @@
+import json
+import math
+import os
+import struct
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import database, models
+from worker_pool import WorkerPool
+
+# Upper bound on the JSON header; anything larger is almost certainly garbage
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+# Elements scanned per slice so peak memory stays bounded for huge tensors
+SCAN_CHUNK_ELEMENTS = 1 << 20
+
+# Validations lost to crashed workers are retried this many times in total; an update that
+# keeps killing its worker is left queued rather than rejected
+MAX_VALIDATION_ATTEMPTS = 3
+
+DTYPE_SIZES = {
+    "F64": 8, "F32": 4, "F16": 2, "BF16": 2,
+    "I64": 8, "I32": 4, "I16": 2, "I8": 1,
+    "U64": 8, "U32": 4, "U16": 2, "U8": 1,
+    "BOOL": 1, "F8_E4M3": 1, "F8_E5M2": 1,
+}
+
+class InvalidUpdateError(Exception):
+    pass
+
+class ReferenceUnavailableError(Exception):
+    """The model version an update is checked against is missing or unreadable. Not the
+    client's fault, so the update is left queued instead of being rejected or accepted."""
+
+def read_safetensors_header(path: str) -> Tuple[Dict, int]:
+    """Returns (tensor header without __metadata__, absolute offset of the data section)."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        prefix = f.read(8)
+        if len(prefix) < 8:
+            raise InvalidUpdateError("File too small to be a safetensors file")
+        (header_size,) = struct.unpack("<Q", prefix)
+        if header_size > MAX_HEADER_SIZE or 8 + header_size > file_size:
+            raise InvalidUpdateError(f"Invalid header size {header_size}")
+        try:
+            header = json.loads(f.read(header_size))
+        except ValueError:
+            raise InvalidUpdateError("Header is not valid JSON")
+
+    if not isinstance(header, dict):
+        raise InvalidUpdateError("Header is not a JSON object")
+    header.pop("__metadata__", None)
+
+    data_offset = 8 + header_size
+    data_size = file_size - data_offset
+
+    for name, info in header.items():
+        if not isinstance(info, dict):
+            raise InvalidUpdateError(f"Malformed entry for tensor '{name}'")
+        dtype = info.get("dtype")
+        shape = info.get("shape")
+        offsets = info.get("data_offsets")
+        if dtype not in DTYPE_SIZES:
+            raise InvalidUpdateError(f"Unsupported dtype {dtype!r} for tensor '{name}'")
+        if not isinstance(shape, list) or not all(isinstance(d, int) and d >= 0 for d in shape):
+            raise InvalidUpdateError(f"Invalid shape for tensor '{name}'")
+        if not isinstance(offsets, list) or len(offsets) != 2 or not all(isinstance(o, int) for o in offsets):
+            raise InvalidUpdateError(f"Invalid data_offsets for tensor '{name}'")
+        begin, end = offsets
+        if end - begin != math.prod(shape) * DTYPE_SIZES[dtype]:
+            raise InvalidUpdateError(f"Tensor '{name}' byte size does not match its shape and dtype")
+
+    # Tensors must tile the data section exactly: no gaps, overlaps or trailing bytes
+    expected_begin = 0
+    for name, info in sorted(header.items(), key=lambda kv: kv[1]["data_offsets"][0]):
+        begin, end = info["data_offsets"]
+        if begin != expected_begin:
+            raise InvalidUpdateError(f"Tensor '{name}' has non-contiguous data offsets")
+        expected_begin = end
+
+    if expected_begin != data_size:
+        raise InvalidUpdateError("Data section size does not match header")
+
+    return header, data_offset
+
+def _check_layout(header: Dict, reference: Dict):
+    missing = reference.keys() - header.keys()
+    unexpected = header.keys() - reference.keys()
+    if missing:
+        raise InvalidUpdateError(f"Missing tensors: {', '.join(sorted(missing)[:5])}")
+    if unexpected:
+        raise InvalidUpdateError(f"Unexpected tensors: {', '.join(sorted(unexpected)[:5])}")
+    for name, ref in reference.items():
+        info = header[name]
+        if info["shape"] != ref["shape"]:
+            raise InvalidUpdateError(f"Shape mismatch for '{name}': {info['shape']} != {ref['shape']}")
+        if info["dtype"] != ref["dtype"]:
+            raise InvalidUpdateError(f"Dtype mismatch for '{name}': {info['dtype']} != {ref['dtype']}")
+
+def _scan_tensor(raw: np.ndarray, dtype: str) -> Optional[float]:
+    """Vectorized finite check over a tensor's raw bytes. Returns its sum of squares,
+    None if it holds a NaN/Inf. Integer tensors are always finite and contribute nothing."""
+    if dtype in ("F64", "F32", "F16"):
+        values = raw.view({"F64": np.float64, "F32": np.float32, "F16": np.float16}[dtype])
+    elif dtype == "BF16":
+        values = raw.view(np.uint16)
+    elif dtype in ("F8_E4M3", "F8_E5M2"):
+        # No numpy type; inspect the exponent bits directly
+        if dtype == "F8_E4M3":
+            bad = (raw & 0x7F) == 0x7F
+        else:
+            bad = (raw & 0x7C) == 0x7C
+        return None if bad.any() else 0.0
+    else:
+        return 0.0
+
+    total = 0.0
+    for start in range(0, values.size, SCAN_CHUNK_ELEMENTS):
+        part = values[start:start + SCAN_CHUNK_ELEMENTS]
+        if dtype == "BF16":
+            if ((part & 0x7F80) == 0x7F80).any():
+                return None
+            part = (part.astype(np.uint32) << 16).view(np.float32)
+        elif not np.isfinite(part).all():
+            return None
+        part = part.astype(np.float64)
+        total += float(np.dot(part, part))
+    return total
+
+def validate_update_file(update_path: str, reference_path: str) -> Dict:
+    """Runs in a worker process. Only plain data crosses the process boundary.
+    `reference_path` is the model version the update was trained from."""
+    try:
+        header, data_offset = read_safetensors_header(update_path)
+
+        try:
+            reference, _ = read_safetensors_header(reference_path)
+        except (OSError, InvalidUpdateError) as e:
+            # Without the layout check any well-formed file would pass, so no verdict is given
+            raise ReferenceUnavailableError(f"Reference model {reference_path} unusable: {e}")
+        _check_layout(header, reference)
+
+        sum_sq = 0.0
+        if header:
+            data = np.memmap(update_path, dtype=np.uint8, mode="r")
+            try:
+                for name, info in header.items():
+                    begin, end = info["data_offsets"]
+                    raw = data[data_offset + begin:data_offset + end]
+                    tensor_sum = _scan_tensor(raw, info["dtype"])
+                    if tensor_sum is None:
+                        raise InvalidUpdateError(f"Tensor '{name}' contains NaN or Inf values")
+                    sum_sq += tensor_sum
+            finally:
+                del data
+
+        return {"valid": True, "reason": None, "l2_norm": math.sqrt(sum_sq)}
+    except InvalidUpdateError as e:
+        # The only verdict that rejects an update; any other error leaves it queued
+        return {"valid": False, "reason": str(e), "l2_norm": None}
+
+class UpdateValidator:
+    def __init__(self, max_workers: Optional[int] = None):
+        self.pool = WorkerPool(max_workers or max(1, (os.cpu_count() or 2) - 1))
+        self._closed = False
+
+    def submit(self, update_id: str, update_path: str, reference_path: str, attempt: int = 1):
+        future = self.pool.submit(validate_update_file, update_path, reference_path)
+        future.add_done_callback(lambda f: self._record_result(update_id, f, (update_path, reference_path, attempt)))
+        return future
+
+    def _record_result(self, update_id: str, future, submission: Tuple[str, str, int]):
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            # A worker died, possibly on another client's update; every validation in flight fails
+            # with it, so retry them on the replacement pool rather than blaming their updates
+            update_path, reference_path, attempt = submission
+            if attempt < MAX_VALIDATION_ATTEMPTS and not self._closed:
+                self.submit(update_id, update_path, reference_path, attempt + 1)
+            else:
+                print(f"Warning: update {update_id} left queued after {attempt} crashed validation attempts")
+            return
+        except Exception as e:
+            # Missing reference, unreadable file, cancellation on shutdown: no verdict. It stays
+            # queued and is submitted again on the next start-up
+            print(f"Warning: update {update_id} left queued: {e}")
+            return
+
+        db = database.SessionLocal()
+        try:
+            update = db.query(models.ModelUpdate).filter(models.ModelUpdate.id == update_id).first()
+            if not update or update.status != "queued":
+                return
+            if result["valid"]:
+                update.status = "validated"
+                update.l2_norm = result["l2_norm"]
+            else:
+                update.status = "rejected"
+                update.rejection_reason = result["reason"]
+            db.commit()
+        finally:
+            db.close()
+
+    def shutdown(self, wait: bool = False):
+        self._closed = True
+        self.pool.shutdown(wait)
+
+# Global instance
+validator = UpdateValidator()
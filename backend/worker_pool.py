@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+class WorkerPool:
+    """Lazily started spawn-context process pool that replaces itself once broken.
+
+    A worker dying (e.g. OOM) breaks the whole ProcessPoolExecutor: its pending futures
+    fail with BrokenProcessPool and it rejects new work. The broken executor is dropped as
+    soon as that is observed, so only work already in flight fails and later submissions
+    get a fresh pool."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers free of the server's threads, sockets and DB connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+
+        def discard_if_broken(f: Future):
+            if not f.cancelled() and isinstance(f.exception(), BrokenProcessPool):
+                self._discard(executor)
+        future.add_done_callback(discard_if_broken)
+        return future
+
+    def shutdown(self, wait: bool = False):
+        # wait=True joins the spawned workers; without it they outlive the server process
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
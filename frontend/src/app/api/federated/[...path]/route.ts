@@ -35,13 +35,25 @@ async function handleRequest(req: NextRequest, path: string, method: string) {
                 body = await req.formData();
             } else if (contentType.includes('application/json')) {
                 body = await req.json();
+            } else if (contentType.includes('application/octet-stream')) {
+                body = await req.arrayBuffer();
             }
         }
 
+        const headers: Record<string, string> = {};
+        if (contentType.includes('application/json') || contentType.includes('application/octet-stream')) {
+            headers['Content-Type'] = contentType;
+        }
+        // Resumable upload protocol headers
+        for (const name of ['upload-offset', 'x-chunk-sha256']) {
+            const value = req.headers.get(name);
+            if (value) headers[name] = value;
+        }
+
         const res = await fetch(targetUrl, {
             method,
-            headers: contentType.includes('application/json') ? { 'Content-Type': 'application/json' } : {},
-            body: body ? (contentType.includes('multipart/form-data') ? body : JSON.stringify(body)) : undefined
+            headers,
+            body: body ? (contentType.includes('application/json') ? JSON.stringify(body) : body) : undefined
         });
 
         const resContentType = res.headers.get('content-type') || '';
@@ -49,6 +49,25 @@ export async function downloadLatestModel(
     };
 }
 
+export interface UploadSession {
+    upload_id: string;
+    status: string;
+    total_size: number;
+    committed_offset: number;
+    chunk_size: number;
+}
+
+const MAX_CHUNK_RETRIES = 5;
+
+async function sha256Hex(data: ArrayBuffer): Promise<string> {
+    const digest = await crypto.subtle.digest('SHA-256', data);
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Resumable chunked upload: a network blip only costs the chunk in flight,
+ * after which we ask the server for its committed offset and continue from there.
+ */
 export async function uploadTrainedUpdate(
     experimentId: string,
     clientId: string,
@@ -56,23 +75,59 @@ export async function uploadTrainedUpdate(
     updatedBuffer: ArrayBuffer,
     onProgress?: (percent: number) => void
 ) {
-    const formData = new FormData();
-    formData.append('experiment_id', experimentId);
-    formData.append('client_id', clientId);
-    formData.append('parent_model_version', parentVersion.toString());
-
-    const blob = new Blob([updatedBuffer], { type: 'application/octet-stream' });
-    formData.append('adapter', blob, 'adapter.safetensors');
+    const session = await axios.post<UploadSession>(`${BASE_URL}/client/uploads`, {
+        experiment_id: experimentId,
+        client_id: clientId,
+        parent_model_version: parentVersion,
+        total_size: updatedBuffer.byteLength,
+        sha256: await sha256Hex(updatedBuffer)
+    });
+    const { upload_id: uploadId, chunk_size: chunkSize } = session.data;
 
-    const res = await axios.post<UpdateResponse>(`${BASE_URL}/client/update`, formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
-        onUploadProgress: (progressEvent) => {
-            if (progressEvent.total && onProgress) {
-                const percentCompleted = Math.round((progressEvent.loaded * 100) / progressEvent.total);
-                onProgress(percentCompleted);
+    let offset = session.data.committed_offset;
+    let failures = 0;
+    let resync = false;
+    while (offset < updatedBuffer.byteLength) {
+        try {
+            if (resync) {
+                // After a failure the server may or may not have committed the chunk; ask where to resume.
+                // This query is retried like any chunk, since the network may still be down.
+                const status = await axios.get<UploadSession>(`${BASE_URL}/client/uploads/${uploadId}`);
+                offset = status.data.committed_offset;
+                resync = false;
+                if (offset >= updatedBuffer.byteLength) break;
             }
+            const chunk = updatedBuffer.slice(offset, offset + chunkSize);
+            const res = await axios.put<UploadSession>(`${BASE_URL}/client/uploads/${uploadId}`, chunk, {
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'Upload-Offset': offset.toString(),
+                    'X-Chunk-SHA256': await sha256Hex(chunk)
+                }
+            });
+            offset = res.data.committed_offset;
+            failures = 0;
+        } catch (err) {
+            if (++failures > MAX_CHUNK_RETRIES) throw err;
+            await new Promise(r => setTimeout(r, 500 * 2 ** failures));
+            resync = true;
+            continue;
         }
-    });
+        if (onProgress) {
+            onProgress(Math.round((offset * 100) / updatedBuffer.byteLength));
+        }
+    }
 
-    return res.data;
+    // Finalize is idempotent, so a retry after a lost response returns the update already created
+    for (let attempt = 1; ; attempt++) {
+        try {
+            const res = await axios.post<UpdateResponse>(`${BASE_URL}/client/uploads/${uploadId}/finalize`);
+            return res.data;
+        } catch (err) {
+            // A checksum mismatch will not fix itself
+            const permanent = axios.isAxiosError(err) && err.response?.status === 422;
+            if (permanent || attempt > MAX_CHUNK_RETRIES) throw err;
+            await new Promise(r => setTimeout(r, 500 * 2 ** attempt));
+        }
+    }
 }